@@ -4,21 +4,46 @@ from __future__ import annotations
 OpenShift Certificate Scanner
 ==============================
 Skanuje certyfikaty we wszystkich namespacach bez wchodzenia do podów.
-Źródła: Secrets, ConfigMaps, Routes, zasoby cluster-level (APIServer, IngressController).
+Źródła: Secrets, ConfigMaps, Routes, zasoby cluster-level (APIServer, IngressController)
+        oraz caBundle webhooków, APIService i konwersji CRD, certyfikaty
+        kubeleta (client/serving) z zatwierdzonych CSR.
 
-Wymagania: oc CLI z aktywną sesją, openssl w PATH
+Wymagania: oc CLI z aktywną sesją (openssl w PATH tylko dla --parser openssl,
+           PyYAML tylko dla --from-dir z plikami YAML)
 Użycie:    python3 cert-scanner.py [--warn-days 30] [--json] [--namespace NAMESPACE]
+           python3 cert-scanner.py --workers 8 --max-inflight 4
+           python3 cert-scanner.py --from-dir ./must-gather --workers 4
 """
 
 import subprocess
 import json
 import base64
+import hashlib
+import os
 import re
 import sys
 import argparse
+import codecs
+import contextvars
+import functools
+import mmap
 import time
+import heapq
+import itertools
+import queue
+import ssl
+import struct
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlencode
+
+try:
+    import yaml  # tylko dla --from-dir z plikami YAML
+except ImportError:
+    yaml = None
 
 # ─── Kolory ANSI ────────────────────────────────────────────────────────────
 RED     = "\033[0;31m"
@@ -35,35 +60,550 @@ PEM_PATTERN = re.compile(
     r"-----BEGIN CERTIFICATE-----[\s\S]+?-----END CERTIFICATE-----"
 )
 CERT_KEYS = re.compile(
-    r"(crt|cert|certificate|pem|ca|bundle|tls)", re.IGNORECASE
+    r"(crt|cert|certificate|pem|der|ca|bundle|tls|jks|p12|pfx|keystore|truststore)",
+    re.IGNORECASE
+)
+
+# Typy Secretów, których standardowe klucze nigdy nie trzymają certyfikatów,
+# a bywają duże (release'y Helma, pull-secrety). Przy --lean-secrets
+# odfiltrowujemy je po stronie API i w ogóle nie pobieramy ich treści.
+SECRET_TYPES_WITHOUT_CERTS = (
+    "helm.sh/release.v1",
+    "kubernetes.io/dockerconfigjson",
+    "kubernetes.io/dockercfg",
+    "kubernetes.io/basic-auth",
+    "kubernetes.io/ssh-auth",
+    "bootstrap.kubernetes.io/token",
 )
 
+# Filtry --field-selector per typ zasobu, ustawiane w main()
+FIELD_SELECTORS: dict[str, str] = {}
+
+# Listowanie stronami po PAGE_SIZE obiektów (limit/continue) ze strumieniowym
+# dekodowaniem; 0 = jedno `oc get -o json` na całą listę (--page-size)
+PAGE_SIZE = 0
+STREAM_CHUNK = 64 * 1024
+
+# Ścieżki API dla `oc get --raw` przy listowaniu stronami
+API_PREFIXES = {
+    "secrets": "/api/v1",
+    "configmaps": "/api/v1",
+    "routes": "/apis/route.openshift.io/v1",
+    "validatingwebhookconfigurations": "/apis/admissionregistration.k8s.io/v1",
+    "mutatingwebhookconfigurations": "/apis/admissionregistration.k8s.io/v1",
+    "apiservices": "/apis/apiregistration.k8s.io/v1",
+    "customresourcedefinitions": "/apis/apiextensions.k8s.io/v1",
+    "certificatesigningrequests": "/apis/certificates.k8s.io/v1",
+}
+
+# Signery CSR kubeleta → klucz w raporcie
+KUBELET_SIGNERS = {
+    "kubernetes.io/kube-apiserver-client-kubelet": "kubelet-client",
+    "kubernetes.io/kubelet-serving": "kubelet-serving",
+}
+NODE_CN = re.compile(r"CN = system:node:([^,\s]+)")
+
+# Silnik parsowania certyfikatów: "builtin" (DER w procesie) lub "openssl"
+CERT_PARSER = "builtin"
+
+# Pula procesów parsowania (--parse-procs): bundle z co najmniej PARSE_POOL_MIN
+# nowymi PEM-ami idą do puli porcjami po najwyżej PARSE_BATCH, mniejsze
+# parsujemy w wątku – przy kilku certyfikatach IPC kosztuje więcej niż zysk
+PARSE_POOL: ProcessPoolExecutor | None = None
+PARSE_PROCS = 0
+PARSE_POOL_MIN = 16
+PARSE_BATCH = 64
+
 # Namespaces systemowe OpenShift – skanowane osobno i oznaczane
 SYSTEM_NS_PREFIXES = (
     "openshift-", "kube-", "default", "redhat-"
 )
 
 
+# Limit wywołań oc "w locie" – ustawiany w main() przez --max-inflight
+# (przy wielu klastrach każdy Cluster ma własny, patrz oc_slots())
+_oc_slots = threading.BoundedSemaphore(1)
+
+# Błędy oc świadczące o przeciążeniu API (429, 5xx, timeouty) – limiter zwalnia
+THROTTLE_ERRORS = re.compile(
+    r"TooManyRequests|ServiceUnavailable|InternalError|Timeout|timed out|"
+    r"deadline exceeded|\b(429|50[0-4])\b",
+    re.IGNORECASE,
+)
+OC_RETRIES = 2
+
+# Bajty odebrane z API per typ zasobu (do porównań przed/po optymalizacji)
+_api_bytes = defaultdict(int)
+_api_bytes_lock = threading.Lock()
+
+
 # ─── Pomocnicze ─────────────────────────────────────────────────────────────
 
-def run_oc(*args, ignore_errors=True, rate_limit=0.05):
-    """Wywołaj oc i zwróć sparsowany JSON lub None."""
-    cmd = ["oc"] + list(args) + ["-o", "json"]
+class Profiler:
+    """
+    --profile: czas, liczba wywołań i bajty per faza (oc per zasób, base64,
+    PEM, parsowanie, deduplikacja, raport) oraz liczba uruchomionych procesów.
+    Czas fazy to suma po wątkach, więc przy --workers > 1 może przekroczyć
+    czas całego przebiegu. Wyłączony kosztuje jedno sprawdzenie flagi.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._stats = defaultdict(lambda: [0, 0.0, 0])  # faza -> [wywołania, s, bajty]
+        self._spawns = defaultdict(int)
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+
+    def add(self, phase: str, seconds: float, calls: int = 1, nbytes: int = 0):
+        with self._lock:
+            stat = self._stats[phase]
+            stat[0] += calls
+            stat[1] += seconds
+            stat[2] += nbytes
+
+    def drain(self) -> tuple[dict, dict]:
+        """Zabierz zebrane liczniki (proces puli --from-dir oddaje je rodzicowi)."""
+        with self._lock:
+            stats, spawns = dict(self._stats), dict(self._spawns)
+            self._stats.clear()
+            self._spawns.clear()
+        return stats, spawns
+
+    def merge(self, drained: tuple[dict, dict]):
+        stats, spawns = drained
+        for phase, (calls, seconds, nbytes) in stats.items():
+            self.add(phase, seconds, calls, nbytes)
+        with self._lock:
+            for program, n in spawns.items():
+                self._spawns[program] += n
+
+    def spawn(self, program: str):
+        if self.enabled:
+            with self._lock:
+                self._spawns[program] += 1
+
+    def timed(self, phase: str):
+        """Dekorator: czas i liczba wywołań funkcji jako faza `phase`."""
+        def wrap(fn):
+            @functools.wraps(fn)
+            def inner(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.add(phase, time.perf_counter() - start)
+            return inner
+        return wrap
+
+    def report(self) -> dict:
+        with self._lock:
+            phases = {
+                name: {"calls": c, "seconds": round(t, 6), "bytes": b}
+                for name, (c, t, b) in sorted(self._stats.items(), key=lambda kv: -kv[1][1])
+            }
+            return {
+                "wall_seconds": round(time.monotonic() - self._started, 3),
+                "phases": phases,
+                "processes": dict(self._spawns),
+            }
+
+    def table(self) -> str:
+        data = self.report()
+        width = max([len(name) for name in data["phases"]] + [28])
+        lines = [
+            f"{BOLD}Profil (--profile): {data['wall_seconds']:.1f} s całości{NC}",
+            f"  {'faza':<{width}} {'wywołań':>9} {'czas [s]':>10} {'bajty':>11}",
+        ]
+        for name, st in data["phases"].items():
+            size = fmt_bytes(st["bytes"]) if st["bytes"] else ""
+            lines.append(f"  {name:<{width}} {st['calls']:>9} {st['seconds']:>10.3f} {size:>11}")
+        spawned = ", ".join(f"{prog} {n}" for prog, n in sorted(data["processes"].items()))
+        lines.append(f"  Uruchomione procesy: {spawned or '0'}")
+        return "\n".join(lines)
+
+
+PROFILE = Profiler()
+
+
+class RateLimiter:
+    """
+    Token bucket współdzielony przez wszystkie wątki skanu: `qps` tokenów na
+    sekundę, najwyżej `burst` naraz. Adaptacyjnie (AIMD): po 429/5xx/timeout
+    tempo spada o połowę, a każde udane wywołanie podnosi je o 2% limitu,
+    aż wróci do --qps. Na spokojnym klastrze skan idzie pełnym tempem,
+    w trakcie upgrade'u sam zwalnia.
+    """
+
+    MIN_QPS = 0.5
+
+    def __init__(self, qps: float = 20.0, burst: int = 20):
+        self.max_qps = max(qps, self.MIN_QPS)
+        self.qps = self.max_qps
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._started = self._last
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.throttled = 0
+        self.min_seen = self.qps
+
+    def new_run(self):
+        """Zeruj liczniki summary() – kolejny przebieg --serve; tempo AIMD zostaje."""
+        with self._lock:
+            self._started = time.monotonic()
+            self.calls = self.throttled = 0
+            self.min_seen = self.qps
+
+    def acquire(self):
+        """Pobierz token; czeka, jeśli wiadro jest puste (rezerwacja "na kredyt")."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.qps)
+            self._last = now
+            self._tokens -= 1
+            self.calls += 1
+            wait = -self._tokens / self.qps if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+            if PROFILE.enabled:
+                PROFILE.add("limiter API (czekanie)", wait)
+
+    def feedback(self, throttled: bool):
+        with self._lock:
+            if throttled:
+                self.throttled += 1
+                self.qps = max(self.MIN_QPS, self.qps / 2)
+                self._tokens = min(self._tokens, 0.0)
+                self.min_seen = min(self.min_seen, self.qps)
+            else:
+                self.qps = min(self.max_qps, self.qps + self.max_qps * 0.02)
+
+    def summary(self) -> str:
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        text = (f"Limiter API: {self.calls} wywołań w {elapsed:.1f} s = "
+                f"{self.calls / elapsed:.1f}/s (limit {self.max_qps:g} QPS, burst {self.burst})")
+        if self.throttled:
+            text += (f", {self.throttled}x przeciążenie API – tempo spadło "
+                     f"do {self.min_seen:.1f} QPS, teraz {self.qps:.1f}")
+        return text
+
+
+# Ustawiany w main() przez --qps / --burst
+LIMITER = RateLimiter()
+
+
+class Cluster:
+    """Kontekst kubeconfig (--context) z własnym limiterem API i limitem --max-inflight."""
+
+    def __init__(self, context: str, limiter: RateLimiter, max_inflight: int):
+        self.context = context
+        self.limiter = limiter
+        self.slots = threading.BoundedSemaphore(max(1, max_inflight))
+
+
+# Klaster bieżącego wątku przy skanie wielu kontekstów (None = bieżący kontekst oc).
+# ContextVar, a nie global: klastry skanujemy równolegle w osobnych wątkach.
+_CLUSTER: contextvars.ContextVar[Cluster | None] = contextvars.ContextVar("cluster", default=None)
+
+
+def oc_cmd(*args) -> list:
+    """Linia poleceń oc – z --context, gdy skanujemy wskazany klaster."""
+    cluster = _CLUSTER.get()
+    if cluster is None:
+        return ["oc", *args]
+    return ["oc", "--context", cluster.context, *args]
+
+
+def limiter() -> RateLimiter:
+    cluster = _CLUSTER.get()
+    return LIMITER if cluster is None else cluster.limiter
+
+
+def oc_slots() -> threading.BoundedSemaphore:
+    """Limit wywołań oc w locie – osobny dla każdego klastra."""
+    cluster = _CLUSTER.get()
+    return _oc_slots if cluster is None else cluster.slots
+
+
+def cluster_ns(ns: str) -> str:
+    """Namespace z prefiksem kontekstu – klucz manifestu przy wielu klastrach."""
+    cluster = _CLUSTER.get()
+    return ns if cluster is None else f"{cluster.context}:{ns}"
+
+
+# Ustawiane w main() przy --context / --all-contexts
+CLUSTERS: list[Cluster] = []
+
+
+def set_max_inflight(n: int):
+    """Ustaw ile wywołań oc może działać równolegle (współdzielone przez wątki klastra)."""
+    global _oc_slots
+    _oc_slots = threading.BoundedSemaphore(max(1, n))
+
+
+def run_oc(*args, ignore_errors=True):
+    """
+    Wywołaj oc i zwróć sparsowany JSON lub None. Tempo wywołań pilnuje
+    limiter klastra; przy przeciążeniu API (429/5xx/timeout) ponawiamy do
+    OC_RETRIES razy.
+    """
+    cmd = oc_cmd(*args, "-o", "json")
+    resource = args[1] if args[0] == "get" and len(args) > 1 else args[0]
+    if not PROFILE.enabled:
+        return _run_oc_attempts(cmd, resource)
+    started = time.perf_counter()
     try:
-        result = subprocess.run(
-            cmd, capture_output=True, text=True, timeout=30
-        )
-        time.sleep(rate_limit)  # delikatny rate-limit, nie przeciążamy API
+        return _run_oc_attempts(cmd, resource)
+    finally:
+        PROFILE.add(f"oc {resource}", time.perf_counter() - started)
+
+
+def _run_oc_attempts(cmd: list, resource: str):
+    api = limiter()
+    for _ in range(OC_RETRIES + 1):
+        api.acquire()
+        PROFILE.spawn("oc")
+        try:
+            with oc_slots():
+                result = subprocess.run(
+                    cmd, capture_output=True, text=True, timeout=30
+                )
+        except subprocess.TimeoutExpired:
+            api.feedback(throttled=True)
+            continue
+        except FileNotFoundError:
+            return None
+        count_api_bytes(resource, len(result.stdout.encode()))
         if result.returncode != 0:
+            if THROTTLE_ERRORS.search(result.stderr):
+                api.feedback(throttled=True)
+                continue
             return None
-        return json.loads(result.stdout)
-    except (subprocess.TimeoutExpired, json.JSONDecodeError, FileNotFoundError):
-        return None
+        api.feedback(throttled=False)
+        try:
+            return json.loads(result.stdout)
+        except json.JSONDecodeError:
+            return None
+    return None
+
+
+def count_api_bytes(resource: str, n: int):
+    with _api_bytes_lock:
+        _api_bytes[resource] += n
+    if PROFILE.enabled:
+        PROFILE.add(f"oc {resource}", 0.0, calls=0, nbytes=n)
+
+
+class ListError(Exception):
+    """Nie udało się pobrać listy zasobów (RBAC, timeout, wygasły continue)."""
+
+
+# Listy, których nie udało się pobrać w bieżącym przebiegu: (kontekst, ns, zasób).
+# Ich wpisy w manifeście i inwentarzu przechodzą bez zmian (patrz scan_scope)
+_failed_lists = set()
+_failed_lists_lock = threading.Lock()
+
+
+def record_list_error(resource: str, ns: str):
+    cluster = _CLUSTER.get()
+    with _failed_lists_lock:
+        _failed_lists.add((cluster.context if cluster else None, ns, resource))
+
+
+_ITEMS_START = re.compile(r'"items"\s*:\s*(\[|null)')
+_CONTINUE = re.compile(r'"continue"\s*:\s*"([^"]*)"')
+_RESOURCE_VERSION = re.compile(r'"resourceVersion"\s*:\s*"([^"]*)"')
+_KIND = re.compile(r'"kind"\s*:\s*"([^"]*)"')
+
+
+def _iter_list_stream(stream, resource: str, page: dict):
+    """
+    Strumieniowy dekoder obiektu List: zwraca itemy po jednym, w buforze
+    trzymając najwyżej bieżący obiekt i jeden chunk. Token `continue`
+    i resourceVersion z metadanych listy trafiają do `page`; kind listy
+    także – przed pierwszym itemem, jeśli stoi przed "items", inaczej na końcu.
+    """
+    decoder = json.JSONDecoder()
+
+    def read(n: int) -> str:
+        if PROFILE.enabled:
+            # Czas czekania na API; dekodowanie między odczytami się nie liczy
+            start = time.perf_counter()
+            chunk = stream.read(n)
+            PROFILE.add(f"oc {resource}", time.perf_counter() - start, calls=0)
+        else:
+            chunk = stream.read(n)
+        count_api_bytes(resource, len(chunk))
+        return chunk
+
+    buf = ""
+    while not (m := _ITEMS_START.search(buf)):
+        chunk = read(STREAM_CHUNK)
+        if not chunk:
+            raise ListError(resource)
+        buf += chunk
+    head, buf = buf[:m.start()], buf[m.end():]
+    if kind := _KIND.search(head):
+        page["kind"] = kind.group(1)
+
+    pos, want = 0, STREAM_CHUNK
+    if m.group(1) == "[":
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) and buf[pos] == "]":
+                pos += 1
+                break
+            try:
+                if pos >= len(buf):
+                    raise ValueError
+                item, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                # Obiekt niekompletny – doczytaj; duże obiekty doczytujemy
+                # coraz większymi porcjami, żeby nie dekodować od nowa w kółko
+                chunk = read(want)
+                if not chunk:
+                    raise ListError(resource)
+                buf, pos = buf[pos:] + chunk, 0
+                want = max(want, len(buf))
+                continue
+            buf, pos, want = buf[end:], 0, STREAM_CHUNK
+            yield item
+
+    tail = buf[pos:] + read(-1)
+    m = _CONTINUE.search(head) or _CONTINUE.search(tail)
+    page["continue"] = m.group(1) if m else ""
+    m = _RESOURCE_VERSION.search(head) or _RESOURCE_VERSION.search(tail)
+    page["resourceVersion"] = m.group(1) if m else ""
+    if "kind" not in page:
+        m = _KIND.search(tail)
+        page["kind"] = m.group(1) if m else ""
+
+
+class _ReadWatchdog:
+    """
+    stdout procesu oc z limitem czasu na każdy odczyt. Limit liczy tylko
+    czekanie na dane z API – przetwarzanie itemów między odczytami (parsowanie,
+    manifest) nie może skończyć się zabiciem listy w połowie strumienia.
+    """
+
+    def __init__(self, proc: subprocess.Popen, timeout: float):
+        self._proc = proc
+        self._timeout = timeout
+        self.expired = False
+
+    def _kill(self):
+        self.expired = True
+        self._proc.kill()
+
+    def read(self, n: int = -1) -> str:
+        timer = threading.Timer(self._timeout, self._kill)
+        timer.start()
+        try:
+            return self._proc.stdout.read(n)
+        finally:
+            timer.cancel()
+
+
+def run_oc_stream(path: str, resource: str, page: dict):
+    """
+    `oc get --raw PATH` czytane strumieniowo przez _iter_list_stream.
+    Slot oc_slots() jest zajęty, dopóki żyje proces oc, czyli także podczas
+    przetwarzania itemów strony – --max-inflight ogranicza więc również
+    równoległe przetwarzanie list stronicowanych (parsowanie dużych bundli
+    można odciążyć przez --parse-procs).
+    """
+    api = limiter()
+    api.acquire()
+    PROFILE.spawn("oc")
+    if PROFILE.enabled:
+        PROFILE.add(f"oc {resource}", 0.0)
+    with oc_slots():
+        try:
+            proc = subprocess.Popen(
+                oc_cmd("get", "--raw", path),
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                text=True, encoding="utf-8",
+            )
+        except FileNotFoundError:
+            raise ListError(resource)
+        stdout = _ReadWatchdog(proc, 30)
+        try:
+            yield from _iter_list_stream(stdout, resource, page)
+        finally:
+            proc.stdout.close()
+            stderr = proc.stderr.read()
+            proc.stderr.close()
+            proc.wait()
+    # API nie odpowiadało przez 30 s (watchdog) albo błąd 429/5xx → zwolnij.
+    # Inne zakończenia sygnałem to nie przeciążenie API.
+    throttled = stdout.expired or bool(THROTTLE_ERRORS.search(stderr))
+    api.feedback(throttled=throttled and proc.returncode != 0)
+    if proc.returncode != 0:
+        raise ListError(resource)
+
+
+def api_path(resource: str, ns: str | None = None) -> str:
+    return API_PREFIXES[resource] + (f"/namespaces/{ns}" if ns else "") + f"/{resource}"
+
+
+def list_items(resource: str, ns: str | None = None):
+    """
+    Iterator po obiektach listy `resource` w namespace `ns` (None = -A).
+    Przy PAGE_SIZE pobiera stronami limit/continue i dekoduje strumieniowo,
+    więc zużycie pamięci nie zależy od wielkości namespace. ListError,
+    gdy listy nie da się pobrać.
+    """
+    selector = FIELD_SELECTORS.get(resource)
+    if not PAGE_SIZE:
+        args = ["get", resource] + (["-n", ns] if ns else ["-A"])
+        if selector:
+            args += ["--field-selector", selector]
+        data = run_oc(*args)
+        if not data:
+            raise ListError(resource)
+        yield from data.get("items", [])
+        return
+
+    path = api_path(resource, ns)
+    token = ""
+    while True:
+        query = {"limit": PAGE_SIZE}
+        if selector:
+            query["fieldSelector"] = selector
+        if token:
+            query["continue"] = token
+        page = {}
+        yield from run_oc_stream(f"{path}?{urlencode(query)}", resource, page)
+        token = page.get("continue")
+        if not token:
+            return
+
+
+def fmt_bytes(n: int) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GiB"
+
+
+def api_bytes_summary() -> str:
+    """'secrets 12.3 MiB, configmaps 1.0 MiB, ...' – bajty odebrane z API."""
+    with _api_bytes_lock:
+        items = sorted(_api_bytes.items(), key=lambda kv: -kv[1])
+    total = sum(n for _, n in items)
+    parts = ", ".join(f"{res} {fmt_bytes(n)}" for res, n in items if n)
+    return f"Pobrano z API: {fmt_bytes(total)} ({parts})"
 
 
 def run_oc_raw(*args, ignore_errors=True):
     """Wywołaj oc bez -o json, zwróć stdout."""
-    cmd = ["oc"] + list(args)
+    cmd = oc_cmd(*args)
+    PROFILE.spawn("oc")
     try:
         result = subprocess.run(
             cmd, capture_output=True, text=True, timeout=30
@@ -73,14 +613,32 @@ def run_oc_raw(*args, ignore_errors=True):
         return ""
 
 
-def parse_cert(pem: str) -> dict | None:
+def parse_not_after(not_after: str) -> datetime | None:
+    """Data w formacie openssl ("Nov  6 07:16:57 2026 GMT") → datetime UTC."""
+    try:
+        expiry = datetime.strptime(not_after, "%b %d %H:%M:%S %Y %Z")
+    except ValueError:
+        return None
+    return expiry.replace(tzinfo=timezone.utc)
+
+
+def days_until(not_after: str) -> int | None:
+    """Dni do wygaśnięcia dla daty w formacie openssl."""
+    expiry = parse_not_after(not_after)
+    if expiry is None:
+        return None
+    return (expiry - datetime.now(timezone.utc)).days
+
+
+def parse_cert_openssl(pem: str) -> dict | None:
     """Parsuj certyfikat przez openssl x509. Zwraca słownik lub None."""
     cmd = [
         "openssl", "x509", "-noout",
         "-subject", "-issuer", "-dates",
-        "-ext", "subjectAltName",
+        "-ext", "subjectAltName,subjectKeyIdentifier,authorityKeyIdentifier,basicConstraints",
         "-fingerprint", "-sha256"
     ]
+    PROFILE.spawn("openssl")
     try:
         result = subprocess.run(
             cmd, input=pem, capture_output=True, text=True, timeout=10
@@ -105,7 +663,8 @@ def parse_cert(pem: str) -> dict | None:
     m = re.search(r"notAfter\s*=\s*(.+)", out)
     info["not_after"] = m.group(1).strip() if m else "?"
 
-    m = re.search(r"SHA256 Fingerprint\s*=\s*(.+)", out)
+    # openssl 1.1 pisze "SHA256 Fingerprint", openssl 3 "sha256 Fingerprint"
+    m = re.search(r"SHA256 Fingerprint\s*=\s*(.+)", out, re.IGNORECASE)
     info["fingerprint"] = m.group(1).strip() if m else ""
 
     # SANy
@@ -114,23 +673,788 @@ def parse_cert(pem: str) -> dict | None:
     )
     info["san"] = san_block.group(1).strip() if san_block else ""
 
-    # Dni do wygaśnięcia
-    info["days_left"] = None
+    # Identyfikatory kluczy (openssl 1.1 poprzedza AKI "keyid:") i flaga CA
+    m = re.search(r"X509v3 Subject Key Identifier[^\n]*\n\s*([0-9A-F:]+)", out)
+    info["ski"] = m.group(1) if m else ""
+    m = re.search(r"X509v3 Authority Key Identifier[^\n]*\n\s*(?:keyid:)?([0-9A-F:]+)", out)
+    info["aki"] = m.group(1) if m else ""
+    info["ca"] = bool(re.search(r"X509v3 Basic Constraints[^\n]*\n\s*CA:TRUE", out))
+
+    info["days_left"] = days_until(info["not_after"])
+    return info
+
+
+# ─── Parser X.509 (DER) ─────────────────────────────────────────────────────
+# Czyta wprost z DER tylko pola potrzebne do raportu i formatuje je tak samo
+# jak `openssl x509 -subject -issuer -dates -ext subjectAltName,... -fingerprint`,
+# więc raport jest identyczny, ale bez forkowania openssl dla każdego PEM.
+
+X509_NAME_OIDS = {
+    "2.5.4.3": "CN", "2.5.4.4": "SN", "2.5.4.5": "serialNumber",
+    "2.5.4.6": "C", "2.5.4.7": "L", "2.5.4.8": "ST", "2.5.4.9": "street",
+    "2.5.4.10": "O", "2.5.4.11": "OU", "2.5.4.12": "title",
+    "2.5.4.13": "description", "2.5.4.15": "businessCategory",
+    "2.5.4.17": "postalCode", "2.5.4.41": "name", "2.5.4.42": "GN",
+    "2.5.4.43": "initials", "2.5.4.44": "generationQualifier",
+    "2.5.4.46": "dnQualifier", "2.5.4.65": "pseudonym",
+    "2.5.4.97": "organizationIdentifier",
+    "1.2.840.113549.1.9.1": "emailAddress",
+    "0.9.2342.19200300.100.1.1": "UID",
+    "0.9.2342.19200300.100.1.25": "DC",
+    "1.3.6.1.4.1.311.60.2.1.1": "jurisdictionL",
+    "1.3.6.1.4.1.311.60.2.1.2": "jurisdictionST",
+    "1.3.6.1.4.1.311.60.2.1.3": "jurisdictionC",
+}
+OID_SAN = "2.5.29.17"
+OID_SKI = "2.5.29.14"
+OID_AKI = "2.5.29.35"
+OID_BASIC_CONSTRAINTS = "2.5.29.19"
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun",
+          "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+# Typy stringów ASN.1 → kodowanie (jak tag2nbyte w openssl; reszta jako #hex)
+_DER_STRINGS = {
+    0x0c: "utf-8", 0x12: "latin-1", 0x13: "latin-1", 0x14: "latin-1",
+    0x16: "latin-1", 0x17: "latin-1", 0x18: "latin-1", 0x1a: "latin-1",
+    0x1c: "utf-32-be", 0x1e: "utf-16-be",
+}
+
+
+def _der_read(buf: bytes, pos: int) -> tuple[int, int, int]:
+    """Odczytaj jeden TLV od `pos`. Zwraca (tag, początek wartości, koniec)."""
+    tag = buf[pos]
+    length = buf[pos + 1]
+    pos += 2
+    if length & 0x80:
+        n = length & 0x7f
+        if not 0 < n <= 4:
+            raise ValueError("nieobsługiwana długość DER")
+        length = int.from_bytes(buf[pos:pos + n], "big")
+        pos += n
+    end = pos + length
+    if end > len(buf):
+        raise ValueError("ucięty DER")
+    return tag, pos, end
+
+
+def _der_children(buf: bytes, start: int, end: int):
+    """Iteruj po elementach SEQUENCE/SET: (tag, początek, koniec, początek TLV)."""
+    pos = start
+    while pos < end:
+        tag, vstart, vend = _der_read(buf, pos)
+        yield tag, vstart, vend, pos
+        pos = vend
+
+
+def _der_oid(raw: bytes) -> str:
+    parts, val = [], 0
+    for byte in raw:
+        val = (val << 7) | (byte & 0x7f)
+        if not byte & 0x80:
+            parts.append(val)
+            val = 0
+    first = min(parts[0] // 40, 2)
+    return ".".join(str(p) for p in [first, parts[0] - 40 * first] + parts[1:])
+
+
+def _der_text(tag: int, raw: bytes) -> str | None:
+    encoding = _DER_STRINGS.get(tag)
+    if encoding is None:
+        return None
+    return raw.decode(encoding)
+
+
+def _der_time(tag: int, raw: bytes) -> str:
+    """UTCTime/GeneralizedTime → format openssl: 'Nov  6 07:16:57 2026 GMT'."""
+    text = raw.decode("ascii")
+    if tag == 0x17:  # UTCTime YYMMDDHHMMSSZ
+        year = int(text[:2])
+        year += 2000 if year < 50 else 1900
+        rest = text[2:]
+    else:            # GeneralizedTime YYYYMMDDHHMMSS[.fff]Z
+        year = int(text[:4])
+        rest = text[4:]
+    month, day = int(rest[0:2]), int(rest[2:4])
+    hh, mm, ss = int(rest[4:6]), int(rest[6:8]), int(rest[8:10])
+    frac = rest[10:].rstrip("Z") if tag == 0x18 else ""
+    zone = " GMT" if text.endswith("Z") else ""
+    return f"{MONTHS[month - 1]} {day:2d} {hh:02d}:{mm:02d}:{ss:02d}{frac} {year}{zone}"
+
+
+def _escape_name_value(text: str) -> str:
+    """Escapowanie wartości jak XN_FLAG_ONELINE (RFC2253 + cudzysłowy)."""
+    data = text.encode("utf-8")
+    out, quote = [], False
+    last = len(data) - 1
+    for i, c in enumerate(data):
+        ch = chr(c)
+        if c < 0x20 or c > 0x7e:
+            out.append(f"\\{c:02X}")
+        elif ch in ",+<>;" or (ch in " #" and i == 0) or (ch == " " and i == last):
+            quote = True
+            out.append(ch)
+        elif ch in '"\\':
+            out.append("\\" + ch)
+        else:
+            out.append(ch)
+    value = "".join(out)
+    return f'"{value}"' if quote else value
+
+
+def _der_name_entries(buf: bytes, start: int, end: int):
+    """Name → lista RDN-ów, każdy jako lista (nazwa, tag, wartość, TLV)."""
+    rdns = []
+    for _, sstart, send, _ in _der_children(buf, start, end):
+        rdn = []
+        for _, astart, aend, _ in _der_children(buf, sstart, send):
+            (_, ostart, oend, _), (vtag, vstart, vend, vpos) = \
+                list(_der_children(buf, astart, aend))[:2]
+            oid = _der_oid(buf[ostart:oend])
+            rdn.append((X509_NAME_OIDS.get(oid, oid), vtag,
+                        buf[vstart:vend], buf[vpos:vend]))
+        rdns.append(rdn)
+    return rdns
+
+
+def _format_name(buf: bytes, start: int, end: int) -> str:
+    """Name w formacie `openssl x509 -subject`: 'CN = x, O = y'."""
+    rdns = []
+    for rdn in _der_name_entries(buf, start, end):
+        avas = []
+        for name, vtag, raw, tlv in rdn:
+            text = _der_text(vtag, raw)
+            value = "#" + tlv.hex().upper() if text is None else _escape_name_value(text)
+            avas.append(f"{name} = {value}")
+        rdns.append(" + ".join(avas))
+    return ", ".join(rdns)
+
+
+def _format_name_oneline(buf: bytes, start: int, end: int) -> str:
+    """Name w starym formacie X509_NAME_oneline: '/CN=x/O=y' (DirName w SAN)."""
+    out = []
+    for rdn in _der_name_entries(buf, start, end):
+        for name, vtag, raw, _ in rdn:
+            text = _der_text(vtag, raw) or ""
+            value = "".join(
+                ch if 0x20 <= ord(ch) <= 0x7e else f"\\x{ord(ch):02X}"
+                for ch in text
+            )
+            out.append(f"/{name}={value}")
+    return "".join(out)
+
+
+# otherName z nazwą, którą openssl wypisuje zamiast OID
+_OTHERNAME_LABELS = {
+    "1.3.6.1.4.1.311.20.2.3": "UPN",
+    "1.3.6.1.5.5.7.8.5": "XmppAddr",
+    "1.3.6.1.5.5.7.8.7": "SRVName",
+    "1.3.6.1.5.5.7.8.8": "NAIRealm",
+    "1.3.6.1.5.5.7.8.9": "SmtpUTF8Mailbox",
+}
+
+
+def _format_san(buf: bytes, start: int, end: int) -> str:
+    """GeneralNames → 'DNS:a, IP Address:1.2.3.4, ...' jak w openssl."""
+    names = []
+    for tag, vstart, vend, _ in _der_children(buf, start, end):
+        raw = buf[vstart:vend]
+        kind = tag & 0x1f
+        if kind == 1:
+            names.append("email:" + raw.decode("latin-1"))
+        elif kind == 2:
+            names.append("DNS:" + raw.decode("latin-1"))
+        elif kind == 6:
+            names.append("URI:" + raw.decode("latin-1"))
+        elif kind == 7:
+            if len(raw) == 4:
+                names.append("IP Address:" + ".".join(str(b) for b in raw))
+            elif len(raw) == 16:
+                groups = (int.from_bytes(raw[i:i + 2], "big") for i in range(0, 16, 2))
+                names.append("IP Address:" + ":".join(f"{g:X}" for g in groups))
+            else:
+                names.append("IP Address:<invalid>")
+        elif kind == 4:
+            _, nstart, nend = _der_read(buf, vstart)
+            names.append("DirName:" + _format_name_oneline(buf, nstart, nend))
+        elif kind == 8:
+            names.append("Registered ID:" + _der_oid(raw))
+        elif kind == 0:
+            (_, ostart, oend, _), (_, xstart, xend, _) = \
+                list(_der_children(buf, vstart, vend))[:2]
+            vtag, sstart, send = _der_read(buf, xstart)
+            text = _der_text(vtag, buf[sstart:send])
+            oid = _der_oid(buf[ostart:oend])
+            label = _OTHERNAME_LABELS.get(oid, oid)
+            names.append(f"othername: {label}::{text if text is not None else '<unsupported>'}")
+        elif kind == 3:
+            names.append("X400Name:<unsupported>")
+        elif kind == 5:
+            names.append("EdiPartyName:<unsupported>")
+    return ", ".join(names)
+
+
+def pem_to_der(pem: str) -> bytes:
+    body = pem.replace("-----BEGIN CERTIFICATE-----", "") \
+              .replace("-----END CERTIFICATE-----", "")
+    return base64.b64decode("".join(body.split()), validate=True)
+
+
+def _hex_id(raw: bytes) -> str:
+    """Identyfikator klucza jak w openssl: AB:CD:..."""
+    return ":".join(f"{b:02X}" for b in raw)
+
+
+def parse_cert_der(pem: str) -> dict | None:
+    """Parsuj certyfikat w procesie (bez openssl). Zwraca słownik lub None."""
     try:
-        expiry = datetime.strptime(info["not_after"], "%b %d %H:%M:%S %Y %Z")
-        expiry = expiry.replace(tzinfo=timezone.utc)
-        info["days_left"] = (expiry - datetime.now(timezone.utc)).days
-    except ValueError:
-        pass
+        der = pem_to_der(pem)
+        _, cstart, cend = _der_read(der, 0)
+        _, tstart, tend = _der_read(der, cstart)
+        fields = [f for f in _der_children(der, tstart, tend)]
+        if fields and fields[0][0] == 0xa0:  # [0] version
+            fields = fields[1:]
+        # serial, signature, issuer, validity, subject, spki, [1], [2], [3]
+        issuer, validity, subject = fields[2], fields[3], fields[4]
+        (nb_tag, nb_s, nb_e, _), (na_tag, na_s, na_e, _) = \
+            list(_der_children(der, validity[1], validity[2]))[:2]
+
+        san = ski = aki = ""
+        is_ca = False
+        for tag, estart, eend, _ in fields[6:]:
+            if tag != 0xa3:
+                continue
+            _, xstart, xend = _der_read(der, estart)
+            for _, ext_s, ext_e, _ in _der_children(der, xstart, xend):
+                ext = list(_der_children(der, ext_s, ext_e))
+                oid = _der_oid(der[ext[0][1]:ext[0][2]])
+                if oid not in (OID_SAN, OID_SKI, OID_AKI, OID_BASIC_CONSTRAINTS):
+                    continue
+                _, ostart, oend, _ = ext[-1][:4]
+                if ostart == oend:
+                    continue
+                _, gstart, gend = _der_read(der, ostart)
+                if oid == OID_SAN:
+                    san = _format_san(der, gstart, gend)
+                elif oid == OID_SKI:
+                    ski = _hex_id(der[gstart:gend])
+                elif oid == OID_AKI:
+                    # [0] keyIdentifier (pomijamy authorityCertIssuer/serial)
+                    for ktag, ks, ke, _ in _der_children(der, gstart, gend):
+                        if ktag == 0x80:
+                            aki = _hex_id(der[ks:ke])
+                else:
+                    # cA BOOLEAN DEFAULT FALSE – pierwszy element, jeśli jest
+                    first = next(_der_children(der, gstart, gend), None)
+                    is_ca = bool(first and first[0] == 0x01 and any(der[first[1]:first[2]]))
+
+        digest = hashlib.sha256(der[:cend]).hexdigest().upper()
+        info = {
+            "subject": _format_name(der, subject[1], subject[2]),
+            "issuer": _format_name(der, issuer[1], issuer[2]),
+            "not_before": _der_time(nb_tag, der[nb_s:nb_e]),
+            "not_after": _der_time(na_tag, der[na_s:na_e]),
+            "fingerprint": ":".join(digest[i:i + 2] for i in range(0, len(digest), 2)),
+            "san": san,
+            "ski": ski,
+            "aki": aki,
+            "ca": is_ca,
+        }
+    except (ValueError, IndexError, UnicodeDecodeError):
+        return None
 
+    info["days_left"] = days_until(info["not_after"])
     return info
 
 
+@PROFILE.timed("parsowanie certyfikatów")
+def parse_cert(pem: str) -> dict | None:
+    """Parsuj certyfikat wybranym silnikiem (CERT_PARSER, --parser)."""
+    if CERT_PARSER == "openssl":
+        return parse_cert_openssl(pem)
+    return parse_cert_der(pem)
+
+
+def parse_batch(pems: list) -> tuple[list, tuple | None]:
+    """Porcja PEM-ów w procesie puli (--parse-procs) + liczniki --profile."""
+    infos = [parse_cert(pem) for pem in pems]
+    return infos, PROFILE.drain() if PROFILE.enabled else None
+
+
+def _pool_worker_init(parser: str, profile: bool):
+    global CERT_PARSER
+    CERT_PARSER = parser
+    PROFILE.enabled = profile
+
+
+def start_parse_pool(procs: int) -> ProcessPoolExecutor:
+    """
+    Uruchom pulę parsowania. Procesy startujemy od razu, z main(), zanim
+    powstaną wątki skanu – fork procesu z działającymi wątkami potrafi
+    zakleszczyć dziecko na locku przejętym w połowie operacji.
+    """
+    pool = ProcessPoolExecutor(max_workers=procs, initializer=_pool_worker_init,
+                               initargs=(CERT_PARSER, PROFILE.enabled))
+    for fut in [pool.submit(int) for _ in range(procs)]:
+        fut.result()
+    return pool
+
+
+def _read_json_versioned(path: str, version: int) -> dict:
+    """Plik stanu z --cache-dir; {} gdy go nie ma, jest uszkodzony albo w innej wersji."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return data if isinstance(data, dict) and data.get("version") == version else {}
+
+
+def _write_json_atomic(path: str, payload: dict):
+    """Zapis przez plik tymczasowy + os.replace – przerwany zapis nie psuje stanu."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+class ParseCache:
+    """
+    Cache sparsowanych certyfikatów. Klucz to SHA-256 surowego PEM – kopie
+    kube-root-ca.crt, service-ca i bundli CA z każdego namespace parsujemy
+    tylko raz. Zapamiętujemy też wynik None, żeby nie parsować w kółko
+    uszkodzonych bloków.
+
+    Z `cache_dir` cache jest też trwały między uruchomieniami: na dysku
+    trzymamy pola bez days_left (liczone na nowo z not_after przy każdym
+    odczycie), a przy zapisie wyrzucamy wpisy nieużywane dłużej niż
+    `max_age_days` i najstarsze ponad `max_entries`. Bez `cache_dir` warstwa
+    "dyskowa" to tylko wyniki poprzedniego przebiegu (--serve).
+    """
+
+    FILE_NAME = "parse-cache.json"
+    VERSION = 2
+
+    def __init__(self, cache_dir: str | None = None,
+                 max_entries: int = 200_000, max_age_days: int = 30):
+        self._entries = {}
+        self._stored = {}
+        self._lock = threading.Lock()
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if cache_dir:
+            self._load()
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.cache_dir, self.FILE_NAME)
+
+    def new_run(self):
+        """
+        Nowe uruchomienie w długo działającym procesie (--serve): wyniki z
+        poprzedniego przebiegu mają już nieaktualne days_left, więc idą tylko
+        do warstwy "dyskowej", z której days_left liczymy na nowo.
+        """
+        with self._lock:
+            if not self.cache_dir:
+                # Bez pliku nie ma eviction w save() – zostaje tylko to, czego
+                # użył poprzedni przebieg, więc zrotowane certyfikaty wypadają
+                now = time.time()
+                self._stored = {key: {"fields": self._fields(info), "seen": now}
+                                for key, info in self._entries.items()}
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def _load(self):
+        self._stored = _read_json_versioned(self.path, self.VERSION).get("entries", {})
+
+    def save(self):
+        """Zapisz cache na dysk (z eviction) – no-op bez cache_dir."""
+        if not self.cache_dir:
+            return
+        cutoff = time.time() - self.max_age_days * 86400
+        with self._lock:
+            entries = [
+                (key, entry) for key, entry in self._stored.items()
+                if entry["seen"] >= cutoff
+            ]
+            entries.sort(key=lambda kv: kv[1]["seen"], reverse=True)
+            # Eviction także w pamięci – przy --serve proces żyje długo
+            self._stored = dict(entries[:self.max_entries])
+            payload = {"version": self.VERSION, "entries": self._stored}
+        _write_json_atomic(self.path, payload)
+
+    _MISSING = object()
+
+    def _lookup(self, key: str):
+        """Wynik z cache (także None) albo _MISSING. Wołane pod self._lock."""
+        if key in self._entries:
+            self.hits += 1
+            return self._entries[key]
+        stored = self._stored.get(key)
+        if stored is None:
+            return self._MISSING
+        stored["seen"] = time.time()
+        fields = stored["fields"]
+        info = None
+        if fields is not None:
+            info = {**fields, "days_left": days_until(fields["not_after"])}
+        self.disk_hits += 1
+        self._entries[key] = info
+        return info
+
+    @staticmethod
+    def _fields(info: dict | None) -> dict | None:
+        """Pola do warstwy dyskowej – bez days_left."""
+        if info is None:
+            return None
+        return {k: v for k, v in info.items() if k != "days_left"}
+
+    def _store(self, key: str, info: dict | None):
+        """Zapamiętaj wynik parsowania. Wołane pod self._lock."""
+        self.misses += 1
+        self._entries[key] = info
+        if self.cache_dir:
+            self._stored[key] = {"fields": self._fields(info), "seen": time.time()}
+
+    def parse(self, pem: str) -> dict | None:
+        key = hashlib.sha256(pem.encode()).hexdigest()
+        with self._lock:
+            info = self._lookup(key)
+        if info is not self._MISSING:
+            return info
+        info = parse_cert(pem)
+        with self._lock:
+            self._store(key, info)
+        return info
+
+    def parse_many(self, pems: list) -> list:
+        """
+        Wyniki parse() dla listy PEM-ów (w tej samej kolejności). Z pulą
+        (--parse-procs) nowe PEM-y dużego bundla idą do procesów porcjami;
+        wątek czeka na nie bez GIL-a, więc pozostałe wątki dalej pobierają
+        dane z API, a parsowanie rozkłada się na rdzenie.
+        """
+        if PARSE_POOL is None or len(pems) < PARSE_POOL_MIN:
+            return [self.parse(pem) for pem in pems]
+        keys = [hashlib.sha256(pem.encode()).hexdigest() for pem in pems]
+        found, missing = {}, {}
+        with self._lock:
+            for key, pem in zip(keys, pems):
+                if key in found or key in missing:
+                    self.hits += 1
+                    continue
+                info = self._lookup(key)
+                if info is self._MISSING:
+                    missing[key] = pem
+                else:
+                    found[key] = info
+        if len(missing) < PARSE_POOL_MIN:
+            infos = [parse_cert(pem) for pem in missing.values()]
+        else:
+            todo = list(missing.values())
+            size = min(PARSE_BATCH, -(-len(todo) // PARSE_PROCS))
+            started = time.perf_counter()
+            futures = [PARSE_POOL.submit(parse_batch, todo[i:i + size])
+                       for i in range(0, len(todo), size)]
+            infos = []
+            for fut in futures:
+                batch, drained = fut.result()
+                infos.extend(batch)
+                if drained:
+                    PROFILE.merge(drained)
+            if PROFILE.enabled:
+                PROFILE.add("pula parsowania (czekanie)", time.perf_counter() - started,
+                            calls=len(futures))
+        with self._lock:
+            for key, info in zip(missing, infos):
+                self._store(key, info)
+                found[key] = info
+        return [found[key] for key in keys]
+
+    def summary(self) -> str:
+        total = self.hits + self.disk_hits + self.misses
+        saved = 100 * (self.hits + self.disk_hits) / total if total else 0
+        text = (f"Cache parsowania: {total} PEM, {self.misses} sparsowanych, "
+                f"{self.hits} z cache")
+        if self.cache_dir:
+            text += f", {self.disk_hits} z dysku"
+        elif self.disk_hits:
+            text += f", {self.disk_hits} z poprzedniego przebiegu"
+        return text + f" ({saved:.0f}% pominięte)"
+
+
+PARSE_CACHE = ParseCache()
+
+
+class ScanManifest:
+    """
+    Manifest skanu przyrostowego: (namespace, zasób, nazwa) → resourceVersion
+    i wiersze raportu z poprzedniego uruchomienia. Obiekty z niezmienionym
+    resourceVersion nie są dekodowane ani parsowane – ich wiersze odtwarzamy
+    z manifestu (days_left liczone na nowo). Obiekty usunięte z klastra
+    po prostu nie trafiają do nowego manifestu.
+
+    Pola certyfikatów trzymamy raz per fingerprint (tabela "certs"), żeby
+    bundle CA skopiowany do tysięcy namespaców nie puchł w pliku.
+    """
+
+    FILE_NAME = "manifest.json"
+    VERSION = 2
+
+    def __init__(self, cache_dir: str):
+        self.path = os.path.join(cache_dir, self.FILE_NAME)
+        data = _read_json_versioned(self.path, self.VERSION)
+        self._previous = data.get("objects", {})
+        self._certs = data.get("certs", {})
+        self._current = {}
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.scanned = 0
+
+    def process(self, resource: str, process, ns: str, item: dict, results: list):
+        """Przetwórz obiekt albo odtwórz jego wiersze, jeśli resourceVersion bez zmian."""
+        meta = item.get("metadata", {})
+        rv = meta.get("resourceVersion", "")
+        key = f"{cluster_ns(ns)}/{resource}/{meta.get('name', '')}"
+        prev = self._previous.get(key)
+
+        if rv and prev and prev["rv"] == rv:
+            rows = []
+            for source, cert_key, ctype, fp in prev["rows"]:
+                fields = self._certs[fp]
+                rows.append({
+                    "ns": ns, "source": source, "key": cert_key, "type": ctype,
+                    **fields, "days_left": days_until(fields["not_after"]),
+                })
+            with self._lock:
+                # Obiekt już przetworzony w tym przebiegu (lista -A zerwana
+                # w połowie, potem skan per namespace) liczymy raz
+                if key not in self._current:
+                    self.reused += 1
+                self._current[key] = prev
+            results.extend(rows)
+            return
+
+        rows = []
+        process(ns, item, rows)
+        results.extend(rows)
+        with self._lock:
+            if key not in self._current:
+                self.scanned += 1
+            # Bez fingerprintu nie odtworzymy wiersza, a uwagi (_note) są per
+            # obiekt, nie per certyfikat – takie obiekty skanujemy zawsze
+            if not rv or any(not r.get("fingerprint") or "_note" in r for r in rows):
+                return
+            for r in rows:
+                self._certs[r["fingerprint"]] = {
+                    k: v for k, v in r.items()
+                    if k not in ("ns", "source", "key", "type", "days_left")
+                }
+            self._current[key] = {
+                "rv": rv,
+                "rows": [[r["source"], r["key"], r["type"], r["fingerprint"]] for r in rows],
+            }
+
+    def save(self, in_scope) -> int:
+        """
+        Zapisz manifest. Wpisy spoza zakresu skanu (in_scope – patrz scan_scope)
+        zostają bez zmian; obiekty z zakresu, których nie ma w tym przebiegu,
+        także z usuniętych namespaców, wypadają. Zwraca liczbę usuniętych.
+        """
+        objects = dict(self._current)
+        deleted = 0
+        for key, entry in self._previous.items():
+            if not in_scope(key):
+                objects.setdefault(key, entry)
+            elif key not in self._current:
+                deleted += 1
+        used = {row[3] for entry in objects.values() for row in entry["rows"]}
+        payload = {
+            "version": self.VERSION,
+            "objects": objects,
+            "certs": {fp: f for fp, f in self._certs.items() if fp in used},
+        }
+        _write_json_atomic(self.path, payload)
+        # Kolejny przebieg w tym samym procesie (--serve) startuje od tego stanu
+        self._previous, self._current = objects, {}
+        self.reused = self.scanned = 0
+        return deleted
+
+
+# Ustawiany w main() przy --incremental
+SCAN_MANIFEST: ScanManifest | None = None
+
+
+class ScanInventory:
+    """
+    Inwentarz przebiegu dla --diff: miejsce (ns/źródło/klucz) → fingerprinty
+    i najbliższa data wygaśnięcia. Porównanie z poprzednim przebiegiem to
+    hash join po miejscu – jedno przejście po każdym z dwóch słowników, O(n).
+
+      new      – miejsca nie było poprzednio
+      rotated  – to samo miejsce, inne fingerprinty
+      removed  – miejsca już nie ma
+      stale    – te same fingerprinty, a certyfikat wchodzi w okno --warn-days
+                 (operator powinien był go już zrotować)
+    """
+
+    FILE_NAME = "inventory.json"
+    VERSION = 1
+
+    def __init__(self, cache_dir: str):
+        self.path = os.path.join(cache_dir, self.FILE_NAME)
+        data = _read_json_versioned(self.path, self.VERSION)
+        self.previous = data.get("entries", {})
+        self.previous_at = data.get("generated")
+        self._current = {}
+        self._lock = threading.Lock()
+
+    def add(self, rows: list):
+        with self._lock:
+            for r in rows:
+                fp = r.get("fingerprint")
+                if not fp:
+                    continue
+                loc = f"{location(r)}/{r['key']}"
+                entry = self._current.get(loc)
+                if entry is None:
+                    self._current[loc] = {
+                        "fp": [fp], "not_after": r["not_after"],
+                        "days_left": r["days_left"], "subject": r["subject"],
+                    }
+                    continue
+                if fp not in entry["fp"]:
+                    entry["fp"].append(fp)
+                days = r["days_left"]
+                if days is not None and (entry["days_left"] is None or days < entry["days_left"]):
+                    entry.update(not_after=r["not_after"], days_left=days, subject=r["subject"])
+
+    def diff(self, warn_days: int, in_scope) -> dict:
+        """
+        Klasyfikacja zmian; "removed" tylko w zakresie skanu (in_scope – patrz
+        scan_scope), także dla namespaców usuniętych z klastra.
+        """
+        changes = {"new": [], "rotated": [], "removed": [], "stale": []}
+        previous = self.previous
+        for loc, entry in self._current.items():
+            prev = previous.get(loc)
+            if prev is None:
+                changes["new"].append((loc, None, entry))
+            elif set(prev["fp"]) != set(entry["fp"]):
+                changes["rotated"].append((loc, prev, entry))
+            elif entry["days_left"] is not None and entry["days_left"] < warn_days:
+                changes["stale"].append((loc, prev, entry))
+        for loc, prev in previous.items():
+            if loc not in self._current and in_scope(loc):
+                changes["removed"].append((loc, prev, None))
+        return changes
+
+    def save(self, in_scope):
+        """
+        Zapisz bieżący przebieg jako punkt odniesienia dla następnego.
+        Wpisy spoza zakresu skanu przechodzą bez zmian (jak w manifeście).
+        """
+        for loc, prev in self.previous.items():
+            if not in_scope(loc):
+                self._current.setdefault(loc, prev)
+        generated = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        _write_json_atomic(self.path, {"version": self.VERSION, "generated": generated,
+                                       "entries": self._current})
+        self.previous, self.previous_at, self._current = self._current, generated, {}
+
+
+# Ustawiany w main() przy --diff
+SCAN_INVENTORY: ScanInventory | None = None
+
+
+class ChainGraph:
+    """
+    Graf wystawca → subject po całym inwentarzu (--chains). Każdy unikalny
+    certyfikat (po fingerprincie) to węzeł; indeksy po SKI i po subjekcie
+    dają wystawcę jednym lookupem, więc analiza jest liniowa.
+
+      missing_issuer  – certyfikat niesamopodpisany bez wystawcy w inwentarzu
+                        ani w systemowym bundlu CA
+      expired_issuer  – wszyscy znalezieni wystawcy wygaśli
+      unused          – pośredni CA (CA:TRUE, nie root), którym nic nie podpisano
+    """
+
+    def __init__(self):
+        self._certs = {}  # fingerprint -> wiersz (pierwsze wystąpienie)
+        self._lock = threading.Lock()
+        self._trusted_ski = set()
+        self._trusted_subjects = set()
+
+    def add(self, rows: list):
+        with self._lock:
+            for r in rows:
+                fp = r.get("fingerprint")
+                if fp and fp not in self._certs:
+                    self._certs[fp] = r
+
+    def add_trusted(self, pems: list):
+        """Kotwice zaufania (np. systemowy bundle CA) – nie są częścią raportu."""
+        for info in PARSE_CACHE.parse_many(pems):
+            if info:
+                self._trusted_subjects.add(info["subject"])
+                if info.get("ski"):
+                    self._trusted_ski.add(info["ski"])
+
+    @staticmethod
+    def _self_signed(c: dict) -> bool:
+        return c["subject"] == c["issuer"] and (not c.get("aki") or c["aki"] == c.get("ski"))
+
+    def analyze(self) -> dict:
+        by_ski = defaultdict(list)
+        by_subject = defaultdict(list)
+        for c in self._certs.values():
+            if c.get("ski"):
+                by_ski[c["ski"]].append(c)
+            by_subject[c["subject"]].append(c)
+
+        findings = {"missing_issuer": [], "expired_issuer": [], "unused": []}
+        used = set()
+        for c in self._certs.values():
+            if self._self_signed(c):
+                continue
+            # AKI wskazuje klucz wystawcy; bez AKI (lub bez SKI u wystawcy) – po nazwie
+            issuers = by_ski.get(c.get("aki")) if c.get("aki") else None
+            if not issuers:
+                issuers = by_subject.get(c["issuer"], [])
+            issuers = [i for i in issuers if i["subject"] == c["issuer"] and i is not c]
+            used.update(i["fingerprint"] for i in issuers)
+            if not issuers:
+                if c.get("aki") not in self._trusted_ski and c["issuer"] not in self._trusted_subjects:
+                    findings["missing_issuer"].append(c)
+            elif all(i["days_left"] is not None and i["days_left"] < 0 for i in issuers):
+                findings["expired_issuer"].append(c)
+
+        findings["unused"] = [
+            c for c in self._certs.values()
+            if c.get("ca") and not self._self_signed(c) and c["fingerprint"] not in used
+        ]
+        return findings
+
+    def reset(self):
+        self._certs = {}
+
+
+# Ustawiany w main() przy --chains
+CHAIN_GRAPH: ChainGraph | None = None
+
+
+@PROFILE.timed("wyciąganie PEM")
 def extract_pems(raw: str) -> list[str]:
     """Wyciągnij wszystkie bloki PEM z dowolnego stringa."""
     return PEM_PATTERN.findall(raw)
 
 
+@PROFILE.timed("base64")
 def decode_secret_value(value: str) -> str:
     """Base64-dekoduj wartość z Secretu."""
     try:
@@ -139,6 +1463,197 @@ def decode_secret_value(value: str) -> str:
         return ""
 
 
+@PROFILE.timed("base64")
+def decode_secret_bytes(value: str) -> bytes:
+    """Base64-dekoduj binarną wartość z Secretu (DER/PKCS#12/JKS)."""
+    return base64.b64decode(value)
+
+
+# ─── Materiał certyfikatów w Secretach ──────────────────────────────────────
+# Wartości Secretów to base64. Zamiast dekodować każdą w całości (keystore'y
+# i bloby potrafią mieć megabajty) najpierw szukamy nagłówka PEM wprost
+# w base64, a gdy go nie ma – dekodujemy tylko początek i rozpoznajemy
+# magię DER / PKCS#12 / JKS. Pełne dekodowanie tylko dla potwierdzonego
+# materiału certyfikatów.
+
+def _b64_needles(marker: bytes) -> tuple[str, ...]:
+    """
+    Postać base64 `marker` dla trzech możliwych przesunięć względem grup
+    3-bajtowych – bez znaków, które zależą od sąsiednich bajtów.
+    """
+    needles = []
+    for shift in range(3):
+        enc = base64.b64encode(b"\0" * shift + marker).decode()
+        start = -(-8 * shift // 6)
+        end = 8 * (shift + len(marker)) // 6
+        needles.append(enc[start:end])
+    return tuple(needles)
+
+
+PEM_B64_NEEDLES = _b64_needles(b"-----BEGIN CERTIFICATE-----")
+SECRET_HEAD_B64 = 64  # tyle znaków base64 (48 bajtów) wystarcza na magię formatu
+JKS_MAGIC = b"\xfe\xed\xfe\xed"
+JCEKS_MAGIC = b"\xce\xce\xce\xce"
+OID_PKCS7_DATA = "1.2.840.113549.1.7.1"
+OID_PKCS7_ENCRYPTED = "1.2.840.113549.1.7.6"
+OID_PKCS12_CERT_BAG = "1.2.840.113549.1.12.10.1.3"
+
+
+def der_to_pem(der: bytes) -> str:
+    body = base64.b64encode(der).decode()
+    lines = [body[i:i + 64] for i in range(0, len(body), 64)]
+    return "-----BEGIN CERTIFICATE-----\n" + "\n".join(lines) + "\n-----END CERTIFICATE-----"
+
+
+@PROFILE.timed("prefiltr Secretów")
+def sniff_secret_value(value: str) -> str:
+    """
+    Rodzaj zawartości po nagłówku, bez pełnego dekodowania:
+    "pem", "der", "pkcs12", "jks" albo "" (nie certyfikat – pomijamy).
+    """
+    if any(n in value for n in PEM_B64_NEEDLES):
+        return "pem"
+    try:
+        head = base64.b64decode(value[:SECRET_HEAD_B64])
+    except ValueError:
+        return ""
+    if head[:4] in (JKS_MAGIC, JCEKS_MAGIC):
+        return "jks"
+    if len(head) < 8 or head[0] != 0x30:
+        return ""
+    # Tylko nagłówek zewnętrznej SEQUENCE – reszty jeszcze nie mamy
+    inner = 2 + (head[1] & 0x7f if head[1] & 0x80 else 0)
+    if len(head) < inner + 3:
+        # Długość długości poza zdekodowanym nagłówkiem – to nie DER
+        return ""
+    # PFX:         SEQUENCE { version INTEGER 3, authSafe SEQUENCE, ... }
+    if head[inner:inner + 3] == b"\x02\x01\x03":
+        return "pkcs12"
+    # Certificate: SEQUENCE { tbsCertificate SEQUENCE { [0] version | serial INTEGER, ... } }
+    # Sama SEQUENCE w SEQUENCE to za mało: tak zaczyna się też CSR
+    # (wersja INTEGER 0) i zaszyfrowany klucz PKCS#8 (AlgorithmIdentifier)
+    if head[inner] != 0x30 or len(head) < inner + 2:
+        return ""
+    tbs = inner + 2 + (head[inner + 1] & 0x7f if head[inner + 1] & 0x80 else 0)
+    if head[tbs:tbs + 4] == b"\xa0\x03\x02\x01":
+        return "der"
+    if head[tbs:tbs + 1] == b"\x02" and head[tbs:tbs + 3] != b"\x02\x01\x00":
+        return "der"  # certyfikat v1 – bez pola wersji, od razu numer seryjny
+    return ""
+
+
+def _der_sequence_items(der: bytes) -> list[bytes]:
+    """Kolejne elementy DER sklejone jeden za drugim (np. łańcuch w pliku .der)."""
+    items, pos = [], 0
+    while pos < len(der) and der[pos] == 0x30:
+        _, _, end = _der_read(der, pos)
+        items.append(der[pos:end])
+        pos = end
+    return items
+
+
+def pkcs12_certificates(der: bytes) -> tuple[list[bytes], int]:
+    """
+    Certyfikaty z niezaszyfrowanych SafeContents pliku PKCS#12 oraz liczba
+    zaszyfrowanych części (bez hasła ich nie odczytamy – w praktyce to
+    zwykle właśnie certyfikaty).
+    """
+    def content(info_start: int, info_end: int) -> tuple[str, int, int]:
+        oid_el, body = list(_der_children(der, info_start, info_end))[:2]
+        _, vstart, vend = _der_read(der, body[1])  # [0] EXPLICIT → wnętrze
+        return _der_oid(der[oid_el[1]:oid_el[2]]), vstart, vend
+
+    certs, encrypted = [], 0
+    _, pstart, pend = _der_read(der, 0)
+    _, auth = list(_der_children(der, pstart, pend))[:2]
+    ctype, astart, aend = content(auth[1], auth[2])
+    if ctype != OID_PKCS7_DATA:
+        return certs, 1
+    _, sstart, send = _der_read(der, astart)  # AuthenticatedSafe SEQUENCE OF ContentInfo
+    for _, cstart, cend, _ in _der_children(der, sstart, send):
+        ctype, vstart, _ = content(cstart, cend)
+        if ctype != OID_PKCS7_DATA:
+            encrypted += ctype == OID_PKCS7_ENCRYPTED
+            continue
+        _, bstart, bend = _der_read(der, vstart)  # SafeContents SEQUENCE OF SafeBag
+        for _, bag_s, bag_e, _ in _der_children(der, bstart, bend):
+            bag_oid, bag_val = list(_der_children(der, bag_s, bag_e))[:2]
+            if _der_oid(der[bag_oid[1]:bag_oid[2]]) != OID_PKCS12_CERT_BAG:
+                continue
+            # CertBag { certId, certValue [0] EXPLICIT OCTET STRING }
+            _, cb_s, cb_e = _der_read(der, bag_val[1])
+            _, value_el = list(_der_children(der, cb_s, cb_e))[:2]
+            _, os_s, os_e = _der_read(der, value_el[1])
+            certs.append(der[os_s:os_e])
+    return certs, encrypted
+
+
+def jks_certificates(raw: bytes) -> list[bytes]:
+    """
+    Certyfikaty z keystore'a JKS/JCEKS. Certyfikaty (trusted i łańcuchy kluczy)
+    leżą tam jawnie – hasło chroni tylko klucze prywatne. Wpis klucza
+    tajnego JCEKS to zserializowany obiekt Javy, więc na nim kończymy.
+    """
+    def utf(pos: int) -> int:
+        (n,) = struct.unpack_from(">H", raw, pos)
+        return pos + 2 + n
+
+    def cert(pos: int) -> int:
+        if version == 2:
+            pos = utf(pos)  # typ certyfikatu ("X.509")
+        (n,) = struct.unpack_from(">I", raw, pos)
+        certs.append(raw[pos + 4:pos + 4 + n])
+        return pos + 4 + n
+
+    certs = []
+    version, count = struct.unpack_from(">II", raw, 4)
+    pos = 12
+    for _ in range(count):
+        (tag,) = struct.unpack_from(">I", raw, pos)
+        pos = utf(pos + 4) + 8  # alias, znacznik czasu
+        if tag == 1:  # klucz prywatny + łańcuch
+            (n,) = struct.unpack_from(">I", raw, pos)
+            (chain,) = struct.unpack_from(">I", raw, pos + 4 + n)
+            pos += 8 + n
+            for _ in range(chain):
+                pos = cert(pos)
+        elif tag == 2:  # trusted certificate
+            pos = cert(pos)
+        else:
+            break
+    return certs
+
+
+def secret_certificates(value: str) -> tuple[list[str], str]:
+    """
+    PEM-y potwierdzonych certyfikatów z wartości Secretu oraz uwaga, gdy
+    część materiału jest nieczytelna (zaszyfrowany PKCS#12, uszkodzony plik).
+    """
+    try:
+        kind = sniff_secret_value(value)
+    except (ValueError, IndexError):
+        return [], ""
+    if not kind:
+        return [], ""
+    if kind == "pem":
+        return extract_pems(decode_secret_value(value)), ""
+    try:
+        raw = decode_secret_bytes(value)
+        if kind == "der":
+            return [der_to_pem(d) for d in _der_sequence_items(raw)], ""
+        if kind == "jks":
+            return [der_to_pem(d) for d in jks_certificates(raw)], ""
+        certs, encrypted = pkcs12_certificates(raw)
+    except (ValueError, IndexError, struct.error):
+        # DER to tylko zgadywanie po nagłówku – uwaga ma sens dla keystore'ów
+        return [], "" if kind == "der" else f"nie udało się odczytać {kind.upper()}"
+    note = ""
+    if encrypted:
+        note = (f"PKCS#12: zaszyfrowane części ({encrypted}) – sprawdź ręcznie "
+                "(openssl pkcs12 -nokeys)")
+    return [der_to_pem(d) for d in certs], note
+
+
 def is_system_ns(ns: str) -> bool:
     return ns.startswith(SYSTEM_NS_PREFIXES)
 
@@ -155,82 +1670,329 @@ def status_color(days: int | None) -> str:
 
 # ─── Skanery źródeł ─────────────────────────────────────────────────────────
 
-def scan_secrets(ns: str, results: list):
-    data = run_oc("get", "secrets", "-n", ns)
-    if not data:
-        return
-    for secret in data.get("items", []):
-        name = secret["metadata"]["name"]
-        stype = secret.get("type", "")
-        secret_data = secret.get("data", {})
-
-        for key, val in secret_data.items():
-            # Sprawdzaj tylko klucze wyglądające na certyfikaty
-            if not CERT_KEYS.search(key) and stype != "kubernetes.io/tls":
+def process_secret(ns: str, secret: dict, results: list):
+    name = secret["metadata"]["name"]
+    stype = secret.get("type", "")
+    secret_data = secret.get("data", {})
+
+    for key, val in secret_data.items():
+        # Sprawdzaj tylko klucze wyglądające na certyfikaty
+        if not CERT_KEYS.search(key) and stype != "kubernetes.io/tls":
+            continue
+        pems, note = secret_certificates(val)
+        for info in PARSE_CACHE.parse_many(pems):
+            if info:
+                results.append({
+                    "ns": ns,
+                    "source": f"Secret/{name}",
+                    "key": key,
+                    "type": stype,
+                    **info,
+                })
+        if note:
+            results.append({
+                "ns": ns,
+                "source": f"Secret/{name}",
+                "key": key,
+                "type": stype,
+                "subject": "(keystore – certyfikaty nieczytelne)",
+                "issuer": "?",
+                "not_before": "?",
+                "not_after": "?",
+                "days_left": None,
+                "san": "",
+                "fingerprint": "",
+                "_note": note,
+            })
+
+
+def process_configmap(ns: str, cm: dict, results: list):
+    name = cm["metadata"]["name"]
+    cm_data = cm.get("data", {})
+    for key, val in cm_data.items():
+        if not CERT_KEYS.search(key) and "BEGIN CERTIFICATE" not in val:
+            continue
+        for info in PARSE_CACHE.parse_many(extract_pems(val)):
+            if info:
+                results.append({
+                    "ns": ns,
+                    "source": f"ConfigMap/{name}",
+                    "key": key,
+                    "type": "configmap",
+                    **info,
+                })
+
+
+# fingerprint → (nazwy DNS z SAN, sufiksy wildcardów "*.x" → "x")
+_SAN_INDEX: dict[str, tuple[frozenset, frozenset]] = {}
+
+
+def san_index(info: dict) -> tuple[frozenset, frozenset]:
+    """Indeks SAN certyfikatu, budowany raz per fingerprint."""
+    idx = _SAN_INDEX.get(info["fingerprint"])
+    if idx is None:
+        exact, wild = set(), set()
+        for entry in info["san"].split(", "):
+            if not entry.startswith("DNS:"):
                 continue
-            decoded = decode_secret_value(val)
-            for pem in extract_pems(decoded):
-                info = parse_cert(pem)
-                if info:
-                    results.append({
-                        "ns": ns,
-                        "source": f"Secret/{name}",
-                        "key": key,
-                        "type": stype,
-                        **info,
-                    })
+            name = entry[4:].lower().rstrip(".")
+            if name.startswith("*."):
+                wild.add(name[2:])
+            else:
+                exact.add(name)
+        idx = _SAN_INDEX[info["fingerprint"]] = (frozenset(exact), frozenset(wild))
+    return idx
 
 
-def scan_configmaps(ns: str, results: list):
-    data = run_oc("get", "configmaps", "-n", ns)
-    if not data:
+def host_covered(host: str, info: dict) -> bool:
+    """
+    Czy SAN certyfikatu obejmuje host. Dwa lookupy w zbiorach zamiast
+    porównywania z każdym wpisem SAN: nazwa dokładna albo wildcard dla
+    domeny nadrzędnej (wildcard pokrywa dokładnie jedną etykietę).
+    """
+    exact, wild = san_index(info)
+    host = host.lower().rstrip(".")
+    if host in exact:
+        return True
+    parent = host.partition(".")[2]
+    return bool(parent) and parent in wild
+
+
+def check_route_tls(host: str, certs: list, ca_certs: list) -> list[str]:
+    """Problemy konfiguracji TLS Route: host spoza SAN, caCertificate spoza łańcucha."""
+    leaf = certs[0]
+    problems = []
+    if host and not host_covered(host, leaf):
+        problems.append(f"host {host} nie jest objęty SAN certyfikatu")
+    # Bez kryptografii sprawdzamy łańcuch po nazwach: wystawca liścia musi być
+    # subjectem któregoś certyfikatu z caCertificate (lub pośredniego z bundla)
+    if ca_certs and leaf["issuer"] != leaf["subject"]:
+        subjects = {c["subject"] for c in certs[1:] + ca_certs}
+        if leaf["issuer"] not in subjects:
+            problems.append(f"caCertificate nie zawiera wystawcy certyfikatu ({leaf['issuer']})")
+    return problems
+
+
+def process_route(ns: str, route: dict, results: list):
+    name = route["metadata"]["name"]
+    spec = route.get("spec", {})
+    tls = spec.get("tls", {})
+    if not tls:
         return
-    for cm in data.get("items", []):
-        name = cm["metadata"]["name"]
-        cm_data = cm.get("data", {})
-        for key, val in cm_data.items():
-            if not CERT_KEYS.search(key) and "BEGIN CERTIFICATE" not in val:
-                continue
-            for pem in extract_pems(val):
-                info = parse_cert(pem)
-                if info:
-                    results.append({
-                        "ns": ns,
-                        "source": f"ConfigMap/{name}",
-                        "key": key,
-                        "type": "configmap",
-                        **info,
-                    })
+    parsed = {}
+    for field in ("certificate", "caCertificate", "destinationCACertificate"):
+        val = tls.get(field, "")
+        if not val:
+            continue
+        parsed[field] = [info for info in PARSE_CACHE.parse_many(extract_pems(val)) if info]
+
+    rows = [
+        {"ns": ns, "source": f"Route/{name}", "key": field, "type": "route-tls", **info}
+        for field, infos in parsed.items()
+        for info in infos
+    ]
+    if parsed.get("certificate"):
+        problems = check_route_tls(spec.get("host", ""), parsed["certificate"],
+                                   parsed.get("caCertificate", []))
+        if problems:
+            # Wiersz liścia jest pierwszy (certificate parsujemy najpierw)
+            rows[0]["_note"] = "; ".join(problems)
+    results.extend(rows)
+
+
+def _process_ca_bundle(ns: str, source: str, key: str, bundle: str, results: list):
+    """caBundle to base64 z PEM (jak wartości Secretów)."""
+    for info in PARSE_CACHE.parse_many(extract_pems(decode_secret_value(bundle))):
+        if info:
+            results.append({
+                "ns": ns,
+                "source": source,
+                "key": key,
+                "type": "ca-bundle",
+                **info,
+            })
+
+
+def _process_webhook_config(kind: str):
+    def process(ns: str, cfg: dict, results: list):
+        name = cfg["metadata"]["name"]
+        for hook in cfg.get("webhooks") or []:
+            bundle = hook.get("clientConfig", {}).get("caBundle", "")
+            if bundle:
+                _process_ca_bundle(ns, f"{kind}/{name}",
+                                   f"webhooks[{hook.get('name', '?')}].caBundle",
+                                   bundle, results)
+    return process
+
+
+process_validating_webhook = _process_webhook_config("ValidatingWebhookConfiguration")
+process_mutating_webhook = _process_webhook_config("MutatingWebhookConfiguration")
+
+
+def process_apiservice(ns: str, svc: dict, results: list):
+    bundle = svc.get("spec", {}).get("caBundle", "")
+    if bundle:
+        _process_ca_bundle(ns, f"APIService/{svc['metadata']['name']}",
+                           "caBundle", bundle, results)
+
+
+def process_crd(ns: str, crd: dict, results: list):
+    bundle = (
+        crd.get("spec", {})
+           .get("conversion", {})
+           .get("webhook", {})
+           .get("clientConfig", {})
+           .get("caBundle", "")
+    )
+    if bundle:
+        _process_ca_bundle(ns, f"CRD/{crd['metadata']['name']}",
+                           "conversion.webhook.caBundle", bundle, results)
+
+
+def process_csr(ns: str, csr: dict, results: list):
+    """Zatwierdzony CSR kubeleta z wystawionym certyfikatem → wiersz Node/<nazwa>."""
+    kind = KUBELET_SIGNERS.get(csr.get("spec", {}).get("signerName", ""))
+    status = csr.get("status", {})
+    if not kind or not status.get("certificate"):
+        return
+    if not any(c.get("type") == "Approved" for c in status.get("conditions") or []):
+        return
+    for pem in extract_pems(decode_secret_value(status["certificate"])):
+        info = PARSE_CACHE.parse(pem)
+        if not info:
+            continue
+        # Nazwa węzła z CN certyfikatu, awaryjnie z użytkownika CSR
+        m = NODE_CN.search(info["subject"])
+        node = m.group(1) if m else csr["spec"].get("username", "?").rpartition(":")[2]
+        results.append({
+            "ns": ns,
+            "source": f"Node/{node}",
+            "key": kind,
+            "type": "kubelet",
+            **info,
+        })
+
+
+def process_item(resource: str, process, ns: str, item: dict, results: list):
+    """Przetwórz jeden obiekt – przez manifest przy --incremental."""
+    if SCAN_MANIFEST is not None:
+        SCAN_MANIFEST.process(resource, process, ns, item, results)
+    else:
+        process(ns, item, results)
+
+
+def _scan_kind(resource: str, process, ns: str, results: list):
+    """Pobierz zasoby z namespace i przetwórz każdy (nic, gdy lista się nie uda)."""
+    rows = []
+    try:
+        for item in list_items(resource, ns):
+            process_item(resource, process, ns, item, rows)
+    except ListError:
+        record_list_error(resource, ns)
+        return
+    results.extend(rows)
+
+
+def scan_secrets(ns: str, results: list):
+    _scan_kind("secrets", process_secret, ns, results)
+
+
+def scan_configmaps(ns: str, results: list):
+    _scan_kind("configmaps", process_configmap, ns, results)
 
 
 def scan_routes(ns: str, results: list):
-    data = run_oc("get", "routes", "-n", ns)
-    if not data:
+    _scan_kind("routes", process_route, ns, results)
+
+
+def scan_ca_bundles(results: list):
+    """
+    caBundle webhooków, APIService i konwersji CRD – każdy typ jednym
+    listowaniem cluster-scoped. Wiersze trafiają pod ns "cluster".
+    """
+    for resource, process in CA_BUNDLE_SCANNERS:
+        rows = []
+        try:
+            for item in list_items(resource):
+                process_item(resource, process, "cluster", item, rows)
+        except ListError:
+            record_list_error(resource, "cluster")
+            continue
+        results.extend(rows)
+
+
+def scan_kubelet_certs(results: list):
+    """
+    Certyfikaty kubeleta (client i serving) z jednej listy CSR. Dla każdego
+    węzła zostaje tylko najnowszy certyfikat danego rodzaju.
+    """
+    rows = []
+    try:
+        for csr in list_items("certificatesigningrequests"):
+            process_item("certificatesigningrequests", process_csr, "cluster", csr, rows)
+    except ListError:
+        record_list_error("certificatesigningrequests", "cluster")
         return
-    for route in data.get("items", []):
-        name = route["metadata"]["name"]
-        tls = route.get("spec", {}).get("tls", {})
-        if not tls:
+    newest = {}
+    for r in rows:
+        ident = (r["source"], r["key"])
+        expiry = parse_not_after(r["not_after"])
+        best = newest.get(ident)
+        if best is None or (expiry and expiry > best[0]):
+            newest[ident] = (expiry, r)
+    results.extend([r for _, r in newest.values()])
+
+
+def resolve_secret_refs(refs: list, results: list):
+    """
+    Rozwiąż referencje konfiguracji cluster-level do Secretów: wszystkie
+    Secrety z jednego namespace pobieramy jednym `oc get secrets a b c`
+    i parsujemy zwykłą ścieżką process_secret. Wiersze dostają źródło
+    i klucz z konfiguracji; gdy Secretu nie ma, zostaje wiersz zastępczy.
+    """
+    wanted = defaultdict(set)
+    for _, secret_ns, secret_name in refs:
+        if secret_name:
+            wanted[secret_ns].add(secret_name)
+
+    fetched = {}
+    for secret_ns, names in wanted.items():
+        data = run_oc("get", "secrets", *sorted(names), "-n", secret_ns,
+                      "--ignore-not-found=true")
+        if not data:
             continue
-        for field in ("certificate", "caCertificate", "destinationCACertificate"):
-            val = tls.get(field, "")
-            if not val:
-                continue
-            for pem in extract_pems(val):
-                info = parse_cert(pem)
-                if info:
-                    results.append({
-                        "ns": ns,
-                        "source": f"Route/{name}",
-                        "key": field,
-                        "type": "route-tls",
-                        **info,
-                    })
+        # Jedna nazwa → oc zwraca sam obiekt zamiast listy
+        items = data["items"] if "items" in data else [data]
+        for secret in items:
+            fetched[(secret_ns, secret["metadata"]["name"])] = secret
+
+    for placeholder, secret_ns, secret_name in refs:
+        secret = fetched.get((secret_ns, secret_name))
+        rows = []
+        if secret is not None:
+            process_secret(secret_ns, secret, rows)
+        if not rows:
+            results.append(placeholder)
+            continue
+        for r in rows:
+            results.append({
+                **r,
+                "ns": placeholder["ns"],
+                "source": placeholder["source"],
+                "key": f"{placeholder['key']} ({r['key']})",
+                "type": "cluster-config",
+            })
+
+
+# Źródła wierszy scan_cluster_level spoza ns "cluster" (np. IngressController
+# w openshift-ingress-operator) – dla scan_scope to też zasoby cluster-level
+CLUSTER_LEVEL_SOURCES = ("APIServer/", "IngressController/", "ETCD/")
 
 
 def scan_cluster_level(results: list):
     """
-    Zasoby cluster-scoped: APIServer, IngressController, Proxy, ETCD.
+    Zasoby cluster-scoped: APIServer, IngressController, Proxy, ETCD
+    oraz caBundle webhooków, APIService i CRD, certyfikaty kubeleta z CSR.
     Nie wchodzimy do podów – tylko czytamy konfigurację.
     """
     checks = [
@@ -239,6 +2001,9 @@ def scan_cluster_level(results: list):
         ("ingresscontroller", "default", "default ingresscontroller"),
     ]
 
+    # Referencje do Secretów: (wiersz zastępczy, namespace, nazwa Secretu)
+    refs = []
+
     # APIServer – certyfikaty w spec.servingCerts.namedCertificates
     api = run_oc("get", "apiserver", "cluster",
                  "--ignore-not-found=true", ignore_errors=True)
@@ -251,7 +2016,7 @@ def scan_cluster_level(results: list):
         for nc in named:
             secret_name = nc.get("servingCertificate", {}).get("name", "")
             names = ", ".join(nc.get("names", []))
-            results.append({
+            refs.append(({
                 "ns": "cluster",
                 "source": "APIServer/cluster",
                 "key": f"namedCert → Secret/{secret_name}",
@@ -264,7 +2029,7 @@ def scan_cluster_level(results: list):
                 "san": names,
                 "fingerprint": "",
                 "_note": f"Sprawdź Secret/{secret_name} w openshift-config",
-            })
+            }, "openshift-config", secret_name))
 
     # IngressController – defaultCertificate
     ic = run_oc(
@@ -279,7 +2044,7 @@ def scan_cluster_level(results: list):
               .get("name", "")
         )
         if default_cert:
-            results.append({
+            refs.append(({
                 "ns": "openshift-ingress-operator",
                 "source": "IngressController/default",
                 "key": f"defaultCertificate → Secret/{default_cert}",
@@ -292,7 +2057,12 @@ def scan_cluster_level(results: list):
                 "san": "*.apps.<cluster>",
                 "fingerprint": "",
                 "_note": f"Sprawdź Secret/{default_cert} w openshift-ingress",
-            })
+            }, "openshift-ingress", default_cert))
+
+    resolve_secret_refs(refs, results)
+
+    scan_ca_bundles(results)
+    scan_kubelet_certs(results)
 
     # Certyfikaty zarządzane przez service-ca (service-ca.crt w każdym namespace)
     # – już będą złapane przez scan_secrets/scan_configmaps
@@ -322,8 +2092,285 @@ def scan_cluster_level(results: list):
         })
 
 
+# Zasoby cluster-scoped z polem caBundle
+CA_BUNDLE_SCANNERS = (
+    ("validatingwebhookconfigurations", process_validating_webhook),
+    ("mutatingwebhookconfigurations", process_mutating_webhook),
+    ("apiservices", process_apiservice),
+    ("customresourcedefinitions", process_crd),
+)
+
+# Zasób listy → rodzaj w polu "source" wierszy (klucze inwentarza); klucze
+# manifestu używają nazwy zasobu
+LIST_SOURCE_KINDS = {
+    "secrets": "Secret",
+    "configmaps": "ConfigMap",
+    "routes": "Route",
+    "validatingwebhookconfigurations": "ValidatingWebhookConfiguration",
+    "mutatingwebhookconfigurations": "MutatingWebhookConfiguration",
+    "apiservices": "APIService",
+    "customresourcedefinitions": "CRD",
+    "certificatesigningrequests": "Node",
+}
+
+# Skanery per-namespace, w kolejności w jakiej trafiają do raportu
+NS_SCANNERS = (
+    ("secrets", scan_secrets, process_secret),
+    ("configmaps", scan_configmaps, process_configmap),
+    ("routes", scan_routes, process_route),
+)
+
+
+def fetch_cluster_wide(namespaces: list, sink=None) -> dict:
+    """
+    Jedno `oc get <zasób> -A` na typ zamiast jednego wywołania per namespace.
+    Obiekty są przetwarzane od razu, a do pamięci trafiają tylko wiersze
+    raportu: {zasób: {namespace: [wiersze]}} dla namespaców z listy (czyli
+    po filtrach --namespace / --skip-system). Jeśli lista cluster-wide się
+    nie uda (np. RBAC nie pozwala), typu nie ma w wyniku i skan wraca dla
+    niego do wywołań per namespace. Z `sink` (--ndjson) wiersze typu trafiają
+    do niego po pobraniu całej listy, a nie do wyniku – lista zerwana w połowie
+    nie może wyemitować obiektów, które skan per namespace wyśle drugi raz.
+    """
+    wanted = set(namespaces)
+    grouped = {}
+    for resource, _, process in NS_SCANNERS:
+        by_ns = defaultdict(list)
+        try:
+            for item in list_items(resource):
+                ns = item.get("metadata", {}).get("namespace", "")
+                if ns in wanted:
+                    process_item(resource, process, ns, item, by_ns[ns])
+        except ListError:
+            print(f"{YELLOW}Nie udało się pobrać listy {resource} -A (RBAC, timeout) – "
+                  f"skan per namespace.{NC}", file=sys.stderr)
+            continue
+        if sink is not None:
+            for rows in by_ns.values():
+                sink.extend(rows)
+            by_ns = {}
+        grouped[resource] = by_ns
+    return grouped
+
+
+def _run_scanner(scanner, ns: str) -> list:
+    out = []
+    scanner(ns, out)
+    return out
+
+
+def scan_namespaces(namespaces: list, workers: int = 1,
+                    prefetched: dict | None = None, sink=None) -> list:
+    """
+    Skanuj namespacy pulą wątków – każde (namespace, źródło) to osobne zadanie.
+    Wyniki składane są w kolejności wejściowej, więc raport i deduplikacja
+    są identyczne niezależnie od liczby workerów. `prefetched` to wynik
+    fetch_cluster_wide() – dla typów tam obecnych nie wołamy już oc.
+    Z `sink` (--ndjson) wynik każdego zadania idzie do niego od razu
+    po zakończeniu, w kolejności ukończenia.
+    """
+    prefetched = prefetched or {}
+    tasks = [
+        (ns, resource, scanner)
+        for ns in namespaces for resource, scanner, _ in NS_SCANNERS
+    ]
+    chunks = [None] * len(tasks)
+    pending = defaultdict(int)
+    for ns, _, _ in tasks:
+        pending[ns] += 1
+    done_ns = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {}
+        for idx, (ns, resource, scanner) in enumerate(tasks):
+            if resource in prefetched:
+                chunks[idx] = prefetched[resource].get(ns, [])
+                pending[ns] -= 1
+                continue
+            # Kopia kontekstu: wątki puli skanują ten sam klaster co wołający
+            futures[pool.submit(contextvars.copy_context().run,
+                                _run_scanner, scanner, ns)] = idx
+        for fut in as_completed(futures):
+            idx = futures[fut]
+            if sink is None:
+                chunks[idx] = fut.result()
+            else:
+                sink.extend(fut.result())
+                chunks[idx] = []
+            ns = tasks[idx][0]
+            pending[ns] -= 1
+            if pending[ns]:
+                continue
+            done_ns += 1
+            tag = "[SYS]" if is_system_ns(ns) else "[APP]"
+            sys.stdout.write(f"\r  Skanowanie {done_ns}/{len(namespaces)}: {tag} {ns:<50}")
+            sys.stdout.flush()
+
+    return [r for chunk in chunks for r in chunk]
+
+
+# ─── Skan offline (--from-dir) ───────────────────────────────────────────────
+# Eksporty `oc get -o json|yaml` albo must-gather zamiast wywołań oc. Pliki
+# idą do puli procesów (parsowanie PEM to CPU, wątki nic by nie dały), duże
+# pliki czytamy przez mmap: najpierw szybki test, czy w ogóle zawierają PEM,
+# a JSON-owe listy dekodujemy strumieniowo, bez kopiowania całego pliku.
+
+OFFLINE_EXTENSIONS = (".json", ".yaml", ".yml")
+OFFLINE_MMAP_MIN = 8 * 1024 * 1024
+# PEM jawny (ConfigMap, Route) albo w base64 (Secret, caBundle): "-----BEGIN";
+# binarne wartości Secretów w base64: DER/PKCS#12 ("MII…"), JKS, JCEKS
+PEM_MARKERS = (b"-----BEGIN CERTIFICATE", b"LS0tLS1CRUdJTi", b"MII", b"/u3+7", b"zs7Oz")
+
+OFFLINE_KINDS = {
+    "Secret": process_secret,
+    "ConfigMap": process_configmap,
+    "Route": process_route,
+    "ValidatingWebhookConfiguration": process_validating_webhook,
+    "MutatingWebhookConfiguration": process_mutating_webhook,
+    "APIService": process_apiservice,
+    "CustomResourceDefinition": process_crd,
+}
+
+
+def _iter_export_items(path: str):
+    """Obiekty z pliku eksportu (pojedyncze albo z listy; YAML wielodokumentowy)."""
+    size = os.path.getsize(path)
+    if not size:
+        return
+    with open(path, "rb") as f:
+        big = size >= OFFLINE_MMAP_MIN
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if big else f.read()
+        try:
+            if all(data.find(m) == -1 for m in PEM_MARKERS):
+                return
+            if path.endswith(".json"):
+                if big and _ITEMS_START.search(data[:STREAM_CHUNK].decode("utf-8", "ignore")):
+                    yield from _iter_list_items_stream(codecs.getreader("utf-8")(data))
+                    return
+                docs = [json.loads(data[:] if big else data)]
+            else:
+                if yaml is None:
+                    raise ValueError("pliki YAML wymagają PyYAML (pip install pyyaml)")
+                stream = codecs.getreader("utf-8")(data) if big else data
+                docs = yaml.load_all(stream, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+            for doc in docs:
+                if not isinstance(doc, dict):
+                    continue
+                if "items" not in doc:
+                    yield doc
+                    continue
+                # Itemy list z must-gather bywają bez kind – bierzemy z "SecretList"
+                list_kind = doc.get("kind", "").removesuffix("List")
+                for item in doc["items"] or []:
+                    if isinstance(item, dict):
+                        item.setdefault("kind", list_kind)
+                        yield item
+        finally:
+            if big:
+                data.close()
+
+
+def _iter_list_items_stream(stream):
+    """
+    Itemy dużej listy JSON strumieniowo, z kind uzupełnionym z kind listy
+    (jak w _iter_export_items). Gdy kind listy stoi dopiero za "items"
+    (`oc get -o json`), itemy bez kind czekają do końca strumienia.
+    """
+    page, pending = {}, []
+    for item in _iter_list_stream(stream, "offline", page):
+        if not isinstance(item, dict):
+            continue
+        if "kind" not in item:
+            if "kind" not in page:
+                pending.append(item)
+                continue
+            item["kind"] = page["kind"].removesuffix("List")
+        yield item
+    for item in pending:
+        item["kind"] = page["kind"].removesuffix("List")
+        yield item
+
+
+@PROFILE.timed("pliki eksportu")
+def scan_export_file(path: str) -> tuple[list, str]:
+    """Zadanie puli: wiersze raportu z jednego pliku i ewentualny błąd."""
+    rows = []
+    try:
+        for item in _iter_export_items(path):
+            process = OFFLINE_KINDS.get(item.get("kind"))
+            if process is None or not isinstance(item.get("metadata"), dict):
+                continue
+            process(item["metadata"].get("namespace") or "cluster", item, rows)
+    except (OSError, ValueError, ListError) as e:
+        return rows, str(e) or type(e).__name__
+    except Exception as e:  # yaml.YAMLError i inne – plik pomijamy, skan idzie dalej
+        return rows, f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"
+    return rows, ""
+
+
+def scan_export_file_profiled(path: str) -> tuple[list, str, tuple]:
+    """scan_export_file w procesie puli + liczniki --profile dla rodzica."""
+    rows, error = scan_export_file(path)
+    return rows, error, PROFILE.drain()
+
+
+def scan_offline(args, sink=None) -> tuple[list, list]:
+    """
+    Skan plików z --from-dir pulą --workers procesów. Kolejność wyników
+    jest kolejnością (posortowanych) plików, więc raport jest powtarzalny.
+    Filtry --namespace / --skip-system / --skip-cluster działają na wierszach.
+    Zwraca (namespacy z wierszami, wiersze).
+    """
+    files = sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(args.from_dir)
+        for name in names if name.endswith(OFFLINE_EXTENSIONS)
+    )
+    print(f"{CYAN}Plików do wczytania: {len(files)} ({args.from_dir}){NC}\n")
+
+    selected = set(args.namespace or [])
+
+    def wanted(ns: str) -> bool:
+        if ns == "cluster":
+            return not args.skip_cluster
+        if selected:
+            return ns in selected
+        return not (args.skip_system and is_system_ns(ns))
+
+    workers = max(1, args.workers)
+    results, namespaces = [], {}
+    worker = scan_export_file_profiled if PROFILE.enabled else scan_export_file
+    with ProcessPoolExecutor(max_workers=workers, initializer=_pool_worker_init,
+                             initargs=(CERT_PARSER, PROFILE.enabled)) as pool:
+        chunksize = max(1, len(files) // (workers * 4))
+        for done, (path, (rows, error, *drained)) in enumerate(
+            zip(files, pool.map(worker, files, chunksize=chunksize)), 1
+        ):
+            if drained:
+                PROFILE.merge(drained[0])
+            if error:
+                print(f"\n{YELLOW}Pominięto {path}: {error}{NC}", file=sys.stderr)
+            rows = [r for r in rows if wanted(r["ns"])]
+            namespaces.update(dict.fromkeys(r["ns"] for r in rows))
+            if sink is None:
+                results.extend(rows)
+            else:
+                sink.extend(rows)
+            sys.stdout.write(f"\r  Wczytywanie {done}/{len(files)}")
+            sys.stdout.flush()
+    print()  # newline po progress
+    return list(namespaces), results
+
+
 # ─── Deduplikacja ────────────────────────────────────────────────────────────
 
+def location(r: dict) -> str:
+    """Miejsce certyfikatu: ns/źródło, przy wielu klastrach z prefiksem kontekstu."""
+    loc = f"{r['ns']}/{r['source']}"
+    return f"{r['cluster']}:{loc}" if "cluster" in r else loc
+
+
+@PROFILE.timed("deduplikacja")
 def deduplicate(results: list) -> list:
     """Usuwa duplikaty oparte na tym samym fingerprincie."""
     seen = {}
@@ -333,7 +2380,11 @@ def deduplicate(results: list) -> list:
         if fp and fp in seen:
             # Dodaj alias
             seen[fp]["_also_in"] = seen[fp].get("_also_in", [])
-            seen[fp]["_also_in"].append(f"{r['ns']}/{r['source']}")
+            seen[fp]["_also_in"].append(location(r))
+            # Uwaga z duplikatu (np. niezgodny host Route) nie może zniknąć
+            if r.get("_note"):
+                note = f"{location(r)}: {r['_note']}"
+                seen[fp]["_note"] = f"{seen[fp]['_note']}; {note}" if seen[fp].get("_note") else note
             continue
         if fp:
             seen[fp] = r
@@ -353,6 +2404,94 @@ def fmt_days(days: int | None) -> str:
     return f"{GREEN}{days} dni{NC}"
 
 
+class NdjsonWriter:
+    """
+    --ndjson: każdy certyfikat wychodzi jako linia JSON, gdy tylko jest gotowy.
+    Pierwsze wystąpienie fingerprintu to pełny rekord (pola jak w --json),
+    kolejne – krótki rekord {"alias_of": fingerprint, "ns", "source", "key"[, "_note"]}.
+    W pamięci zostaje tylko zbiór widzianych fingerprintów. Ma append/extend,
+    więc można go podać wszędzie tam, gdzie skanery dostają listę wyników.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._seen = set()
+        self._lock = threading.Lock()
+        self.records = 0
+        self.aliases = 0
+
+    def append(self, row: dict):
+        self.extend([row])
+
+    def extend(self, rows: list):
+        if not rows:
+            return
+        with self._lock:
+            lines = []
+            for r in rows:
+                fp = r.get("fingerprint")
+                if fp and fp in self._seen:
+                    alias = {"alias_of": fp, "ns": r["ns"], "source": r["source"], "key": r["key"]}
+                    if "cluster" in r:
+                        alias["cluster"] = r["cluster"]
+                    if r.get("_note"):
+                        alias["_note"] = r["_note"]
+                    r = alias
+                    self.aliases += 1
+                else:
+                    if fp:
+                        self._seen.add(fp)
+                    self.records += 1
+                lines.append(json.dumps(r, ensure_ascii=False) + "\n")
+            for observer in (SCAN_INVENTORY, CHAIN_GRAPH):
+                if observer is not None:
+                    observer.add(rows)
+            self._stream.write("".join(lines))
+            self._stream.flush()
+
+
+def print_diff(changes: dict, since: str | None):
+    """Zwięzły raport zmian względem poprzedniego przebiegu (--diff)."""
+    labels = (
+        ("new", GREEN, "+", "NOWY"),
+        ("rotated", CYAN, "~", "ZROTOWANY"),
+        ("removed", MAGENTA, "-", "USUNIĘTY"),
+        ("stale", YELLOW, "!", "BEZ ROTACJI"),
+    )
+    counts = ", ".join(f"{label.lower()}: {len(changes[k])}" for k, _, _, label in labels)
+    print(f"{BOLD}Zmiany od {since or '(brak poprzedniego przebiegu)'}{NC} – {counts}")
+    if since is None:
+        return
+    for k, color, mark, label in labels:
+        for loc, prev, cur in changes[k]:
+            line = f"  {color}{mark} {label:<11}{NC} {loc}"
+            if k == "rotated":
+                line += f"  {prev['fp'][0][:11]}… → {cur['fp'][0][:11]}…, do {cur['not_after']}"
+            elif k == "removed":
+                line += f"  (był do {prev['not_after']})"
+            else:
+                line += f"  {cur['subject']}, {fmt_days(cur['days_left'])}"
+            print(line)
+    print()
+
+
+def print_chains(findings: dict):
+    """Wyniki analizy łańcuchów (--chains)."""
+    labels = (
+        ("missing_issuer", RED, "BRAK WYSTAWCY"),
+        ("expired_issuer", RED, "WYSTAWCA WYGASŁ"),
+        ("unused", MAGENTA, "NIEUŻYWANY CA"),
+    )
+    counts = ", ".join(f"{label.lower()}: {len(findings[k])}" for k, _, label in labels)
+    print(f"{BOLD}Łańcuchy CA{NC} – {counts}")
+    for k, color, label in labels:
+        for c in findings[k]:
+            detail = f"wystawca: {c['issuer']}" if k != "unused" else c["subject"]
+            print(f"  {color}{label:<15}{NC} {location(c)}/{c['key']}  {detail}")
+    print()
+
+
+@PROFILE.timed("raport")
 def print_report(results: list, warn_days: int, output_json: bool):
     if output_json:
         print(json.dumps(results, indent=2, ensure_ascii=False))
@@ -378,7 +2517,8 @@ def print_report(results: list, warn_days: int, output_json: bool):
         print(f"{color}{BOLD}{'─'*70}{NC}")
         for r in items:
             ns_tag = f"{MAGENTA}[SYS]{NC}" if is_system_ns(r["ns"]) else f"{CYAN}[APP]{NC}"
-            print(f"\n  {ns_tag} {BOLD}{r['ns']}{NC} / {r['source']}  ({r['key']})")
+            cluster = f"{r['cluster']}: " if "cluster" in r else ""
+            print(f"\n  {ns_tag} {BOLD}{cluster}{r['ns']}{NC} / {r['source']}  ({r['key']})")
             print(f"      Subject : {r['subject']}")
             if r.get("san"):
                 print(f"      SANs    : {r['san']}")
@@ -406,9 +2546,590 @@ def print_report(results: list, warn_days: int, output_json: bool):
     print(f"{BOLD}{BLUE}{'═'*70}{NC}\n")
 
 
+# ─── Tryb watch ──────────────────────────────────────────────────────────────
+# Zamiast pełnego skanu co N godzin: jedna lista na typ, potem strumienie
+# watch. Certyfikaty leżą w min-heapie po not_after, a przekroczenie progu
+# --warn-days (i samo wygaśnięcie) wychodzi jako zdarzenie w chwili, gdy
+# nastąpi – bez ponownego skanowania.
+
+WATCH_TIMEOUT = 300  # po tylu sekundach API zamyka watch, wznawiamy od RV
+WATCH_LIST_ATTEMPTS = 3  # po tylu nieudanych listach typ nie wstrzymuje zdarzeń
+
+
+class ExpiryIndex:
+    """
+    Min-heap (moment zdarzenia, ...) dla wszystkich certyfikatów z inwentarza.
+    Każdy obiekt (zasób, namespace, nazwa) ma generację – po zmianie lub
+    usunięciu stare wpisy w heapie są pomijane przy zdejmowaniu (lazy delete).
+    Zdarzenia liczymy per fingerprint: ten sam certyfikat w wielu Secretach
+    i ConfigMapach daje jedno zdarzenie z listą lokalizacji, a raz wysłany
+    etap nie powtarza się po MODIFIED, który nie zmienił certyfikatu.
+    """
+
+    def __init__(self, warn_days: int):
+        self.warn = warn_days * 86400
+        self._heap = []
+        self._objects = {}  # obj_key -> (generacja, wiersze)
+        self._locations = {}  # ident -> {(obj_key, indeks wiersza)}
+        self._fired = {}  # ident -> wysłany etap
+        self._gen = itertools.count()
+
+    def __len__(self) -> int:
+        return sum(len(rows) for _, rows in self._objects.values())
+
+    def keys(self, resource: str) -> set:
+        return {k for k in self._objects if k[0] == resource}
+
+    @staticmethod
+    def _ident(obj_key: tuple, row: dict):
+        # Bez fingerprintu (nieparsowalny PEM) nie da się łączyć kopii
+        return row.get("fingerprint") or (obj_key, row["key"])
+
+    def _unlink(self, obj_key: tuple) -> set:
+        """Usuń lokalizacje obiektu z indeksu; zwraca identy, które straciły wszystkie."""
+        old = self._objects.pop(obj_key, None)
+        orphaned = set()
+        for i, row in enumerate(old[1] if old else ()):
+            ident = self._ident(obj_key, row)
+            locs = self._locations[ident]
+            locs.discard((obj_key, i))
+            if not locs:
+                del self._locations[ident]
+                orphaned.add(ident)
+        return orphaned
+
+    def replace(self, obj_key: tuple, rows: list):
+        gen = next(self._gen)
+        orphaned = self._unlink(obj_key)
+        self._objects[obj_key] = (gen, rows)
+        for i, row in enumerate(rows):
+            self._locations.setdefault(self._ident(obj_key, row), set()).add((obj_key, i))
+            expiry = parse_not_after(row.get("not_after", ""))
+            if expiry is None:
+                continue
+            exp = expiry.timestamp()
+            heapq.heappush(self._heap, (exp - self.warn, exp, gen, obj_key, i, "warn"))
+        # MODIFIED bez zmiany certyfikatu zachowuje wysłany już etap
+        for ident in orphaned - self._locations.keys():
+            self._fired.pop(ident, None)
+
+    def remove(self, obj_key: tuple):
+        for ident in self._unlink(obj_key):
+            self._fired.pop(ident, None)
+
+    def _valid(self, entry) -> bool:
+        _, _, gen, obj_key, _, _ = entry
+        cur = self._objects.get(obj_key)
+        return cur is not None and cur[0] == gen
+
+    def next_deadline(self) -> float | None:
+        while self._heap and not self._valid(self._heap[0]):
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def due(self, now: float) -> list:
+        """
+        Zdejmij wszystko, czego czas nadszedł. Zwraca [(etap, wiersz)] – jeden
+        wiersz na fingerprint, z listą wszystkich lokalizacji w "locations".
+        """
+        events = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if not self._valid(entry):
+                continue
+            _, exp, gen, obj_key, i, stage = entry
+            row = self._objects[obj_key][1][i]
+            if stage == "warn":
+                if exp > now:
+                    heapq.heappush(self._heap, (exp, exp, gen, obj_key, i, "expired"))
+                else:
+                    stage = "expired"
+            ident = self._ident(obj_key, row)
+            fired = self._fired.get(ident)
+            if fired == stage or (stage == "warn" and fired is not None):
+                continue
+            self._fired[ident] = stage
+            locations = sorted(
+                f"{r['ns']}/{r['source']} ({r['key']})"
+                for r in (self._objects[k][1][j] for k, j in self._locations[ident])
+            )
+            events.append((stage, {**row, "locations": locations}))
+        return events
+
+
+def _watch_stream(resource: str, q: queue.Queue, procs: list):
+    """
+    Wątek jednego typu zasobu: lista (RELIST/ADDED.../SYNC) i watch od jej
+    resourceVersion. Zdarzenia idą do kolejki – indeks zmienia tylko główny
+    wątek. Po 410 Gone (za stary RV) robimy pełną listę od nowa.
+    """
+    selector = FIELD_SELECTORS.get(resource)
+    rv = ""
+    backoff = 1
+    while True:
+        if not rv:
+            q.put(("RELIST", resource, None))
+            token = ""
+            try:
+                while True:
+                    query = {"limit": PAGE_SIZE or 500}
+                    if selector:
+                        query["fieldSelector"] = selector
+                    if token:
+                        query["continue"] = token
+                    page = {}
+                    for item in run_oc_stream(f"{api_path(resource)}?{urlencode(query)}",
+                                              resource, page):
+                        q.put(("ADDED", resource, item))
+                    token = page.get("continue")
+                    if not token:
+                        rv = page.get("resourceVersion", "")
+                        break
+            except ListError:
+                q.put(("LIST_ERROR", resource, None))
+                time.sleep(min(backoff, 60))
+                backoff *= 2
+                continue
+            q.put(("SYNC", resource, None))
+            backoff = 1
+
+        query = {"watch": 1, "allowWatchBookmarks": "true",
+                 "resourceVersion": rv, "timeoutSeconds": WATCH_TIMEOUT}
+        if selector:
+            query["fieldSelector"] = selector
+        limiter().acquire()
+        try:
+            proc = subprocess.Popen(
+                oc_cmd("get", "--raw", f"{api_path(resource)}?{urlencode(query)}"),
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                text=True, encoding="utf-8",
+            )
+        except FileNotFoundError:
+            q.put(("LIST_ERROR", resource, None))
+            return
+        procs.append(proc)
+        for line in proc.stdout:
+            count_api_bytes(resource, len(line))
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            etype = event.get("type")
+            obj = event.get("object", {})
+            if etype == "ERROR":
+                if obj.get("code") == 410:
+                    rv = ""
+                break
+            rv = obj.get("metadata", {}).get("resourceVersion", rv)
+            if etype in ("ADDED", "MODIFIED", "DELETED"):
+                q.put((etype, resource, obj))
+        proc.wait()
+        procs.remove(proc)
+        if proc.returncode != 0:
+            time.sleep(min(backoff, 60))
+            backoff *= 2
+
+
+def emit_event(stage: str, row: dict, output_json: bool):
+    now = datetime.now(timezone.utc)
+    row = {**row, "days_left": days_until(row.get("not_after", ""))}
+    if output_json:
+        print(json.dumps({"event": stage, "time": now.isoformat(timespec="seconds"),
+                          **row}, ensure_ascii=False), flush=True)
+        return
+    label = f"{RED}{BOLD}WYGASŁ{NC}" if stage == "expired" else f"{YELLOW}{BOLD}UWAGA{NC} "
+    print(f"{now:%Y-%m-%d %H:%M:%S} {label} {row['ns']}/{row['source']} ({row['key']})  "
+          f"{row['subject']}  →  {fmt_days(row['days_left'])}  [{row['not_after']}]",
+          flush=True)
+    here = f"{row['ns']}/{row['source']} ({row['key']})"
+    for loc in row.get("locations", ()):
+        if loc != here:
+            print(f"    ten sam certyfikat: {loc}", flush=True)
+
+
+def watch_loop(wanted, warn_days: int, output_json: bool):
+    """
+    Tryb ciągły: indeks wygaśnięć + strumienie watch dla Secrets, ConfigMaps
+    i Routes (cluster-wide). `wanted(ns)` to filtr namespaców. Zdarzenia
+    progowe czekają na pierwszą pełną listę każdego typu, chyba że typu nie
+    da się listować (WATCH_LIST_ATTEMPTS porażek z rzędu, np. RBAC) – wtedy
+    idą bez niego, a jego strumień dalej ponawia w tle.
+    """
+    index = ExpiryIndex(warn_days)
+    processors = {resource: process for resource, _, process in NS_SCANNERS}
+    q = queue.Queue()
+    procs = []
+    for resource in processors:
+        threading.Thread(target=_watch_stream, args=(resource, q, procs),
+                         daemon=True).start()
+
+    relisting = {}
+    synced = set()
+    given_up = set()
+    failures = defaultdict(int)
+    ready = False
+    try:
+        while True:
+            deadline = index.next_deadline()
+            timeout = 60.0 if deadline is None else min(60.0, max(0.0, deadline - time.time()))
+            try:
+                etype, resource, obj = q.get(timeout=timeout)
+            except queue.Empty:
+                etype = None
+
+            if etype == "RELIST":
+                relisting[resource] = index.keys(resource)
+            elif etype == "SYNC":
+                for key in relisting.pop(resource, set()):
+                    index.remove(key)
+                synced.add(resource)
+                given_up.discard(resource)
+                failures.pop(resource, None)
+            elif etype == "LIST_ERROR":
+                print(f"{YELLOW}Nie można listować/obserwować {resource} -A "
+                      f"(RBAC?) – ponawiam.{NC}", file=sys.stderr)
+                failures[resource] += 1
+                if resource not in synced and failures[resource] == WATCH_LIST_ATTEMPTS:
+                    given_up.add(resource)
+                    print(f"{YELLOW}Zdarzenia bez {resource} – lista nie udała się "
+                          f"{WATCH_LIST_ATTEMPTS}x z rzędu.{NC}", file=sys.stderr)
+            elif etype in ("ADDED", "MODIFIED", "DELETED"):
+                meta = obj.get("metadata", {})
+                ns = meta.get("namespace", "")
+                key = (resource, ns, meta.get("name", ""))
+                relisting.get(resource, set()).discard(key)
+                if etype == "DELETED" or not wanted(ns):
+                    index.remove(key)
+                else:
+                    rows = []
+                    processors[resource](ns, obj, rows)
+                    index.replace(key, rows)
+
+            # Zdarzenia progowe emitujemy dopiero po pierwszej pełnej liście
+            # każdego typu (albo rezygnacji z niego)
+            if not ready and len(synced | given_up) == len(processors):
+                ready = True
+                print(f"{CYAN}Inwentarz: {len(index)} certyfikatów – "
+                      f"obserwuję zmiany (Ctrl-C kończy){NC}", file=sys.stderr)
+            if ready:
+                for stage, row in index.due(time.time()):
+                    emit_event(stage, row, output_json)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for proc in list(procs):
+            proc.kill()
+
+
+# ─── Eksporter OpenMetrics ───────────────────────────────────────────────────
+# --serve PORT: skan w tle co --refresh-interval sekund, a /metrics podaje
+# gotowy tekst z pamięci – scrape nie uruchamia żadnego `oc`.
+
+OPENMETRICS_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+METRICS_RENDER_TTL = 60  # co ile sekund przeliczamy cert_expiry_days
+
+
+def _metric_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsStore:
+    """Ostatni wynik skanu + wyrenderowany payload /metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = []
+        self._count = 0
+        self._duration = None
+        self._finished = None
+        self._payload = b""
+        self._rendered = 0.0
+
+    @staticmethod
+    def _build_series(results: list) -> list:
+        """[(nazwa serii z etykietami, moment wygaśnięcia)] – raz na skan, nie na scrape."""
+        series = []
+        for r in results:
+            expiry = parse_not_after(r.get("not_after", ""))
+            if expiry is None:
+                continue
+            labels = ",".join(
+                f'{name}="{_metric_label(r.get(field, ""))}"'
+                for name, field in (("ns", "ns"), ("source", "source"),
+                                    ("key", "key"), ("fingerprint", "fingerprint"))
+            )
+            if "cluster" in r:
+                labels = f'cluster="{_metric_label(r["cluster"])}",{labels}'
+            series.append((f"cert_expiry_days{{{labels}}}", expiry.timestamp()))
+        return series
+
+    def update(self, results: list, duration: float):
+        # strptime i etykiety liczymy w wątku skanu, bez blokady scrape'ów
+        series = self._build_series(results)
+        with self._lock:
+            self._series = series
+            self._count = len(results)
+            self._duration = duration
+            self._finished = time.time()
+            self._rendered = 0.0
+
+    def _render(self, now: float) -> bytes:
+        lines = [
+            "# TYPE cert_expiry_days gauge",
+            "# HELP cert_expiry_days Days until the certificate expires (negative = expired).",
+            "# UNIT cert_expiry_days days",
+        ]
+        lines += [f"{name} {(expiry - now) / 86400:.3f}" for name, expiry in self._series]
+        lines += [
+            "# TYPE cert_scan_duration_seconds gauge",
+            "# HELP cert_scan_duration_seconds Wall time of the last completed scan.",
+            "# UNIT cert_scan_duration_seconds seconds",
+            f"cert_scan_duration_seconds {self._duration:.3f}",
+            "# TYPE cert_scan_certificates gauge",
+            "# HELP cert_scan_certificates Unique certificates in the last scan.",
+            f"cert_scan_certificates {self._count}",
+        ]
+        return ("\n".join(lines) + "\n").encode()
+
+    def payload(self) -> bytes:
+        """Tekst OpenMetrics; seria certyfikatów przeliczana co METRICS_RENDER_TTL."""
+        now = time.time()
+        with self._lock:
+            if self._finished is None:
+                return b"# EOF\n"
+            if now - self._rendered > METRICS_RENDER_TTL:
+                self._payload = self._render(now)
+                self._rendered = now
+            age = (
+                "# TYPE cert_scan_age_seconds gauge\n"
+                "# HELP cert_scan_age_seconds Seconds since the last completed scan.\n"
+                "# UNIT cert_scan_age_seconds seconds\n"
+                f"cert_scan_age_seconds {now - self._finished:.3f}\n# EOF\n"
+            )
+            return self._payload + age.encode()
+
+
+def serve_metrics(store: MetricsStore, addr: str, port: int) -> ThreadingHTTPServer:
+    """Uruchom serwer /metrics w wątku w tle."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = store.payload()
+            self.send_response(200)
+            self.send_header("Content-Type", OPENMETRICS_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((addr, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def scan_live(args, sink=None) -> tuple[list, list]:
+    """
+    Skan przez oc: namespacy → Secrets/ConfigMaps/Routes → cluster-level.
+    Zwraca (namespacy, wiersze). ListError, gdy nie da się pobrać listy
+    namespaców.
+    """
+    # Pobierz listę namespaców
+    if args.namespace:
+        namespaces = args.namespace
+    else:
+        ns_data = run_oc("get", "namespaces")
+        if not ns_data:
+            raise ListError("namespaces")
+        namespaces = [item["metadata"]["name"] for item in ns_data.get("items", [])]
+
+    if args.skip_system:
+        namespaces = [ns for ns in namespaces if not is_system_ns(ns)]
+
+    print(f"{CYAN}Namespaców do skanowania: {len(namespaces)}{NC}\n")
+
+    prefetched = None
+    if args.cluster_wide:
+        print(f"{CYAN}Pobieranie zasobów cluster-wide (-A)...{NC}")
+        prefetched = fetch_cluster_wide(namespaces, sink)
+
+    # Skanuj namespacy (równolegle przy --workers > 1)
+    results = scan_namespaces(namespaces, args.workers, prefetched, sink)
+
+    print()  # newline po progress
+
+    # Zasoby cluster-level
+    if not args.skip_cluster:
+        print(f"{CYAN}Skanowanie zasobów cluster-level...{NC}")
+        scan_cluster_level(results if sink is None else sink)
+    return namespaces, results
+
+
+class ClusterSink:
+    """Oznacza wiersze kontekstem klastra i przekazuje do wspólnego sinka (--ndjson)."""
+
+    def __init__(self, sink, context: str):
+        self._sink = sink
+        self._context = context
+
+    def append(self, row: dict):
+        self.extend([row])
+
+    def extend(self, rows: list):
+        rows = list(rows)
+        for r in rows:
+            r["cluster"] = self._context
+        self._sink.extend(rows)
+
+
+def scan_clusters(args, sink=None) -> tuple[list, list]:
+    """
+    Skan wielu kontekstów naraz: każdy klaster w osobnym wątku, z własnym
+    limiterem API, cache parsowania jest wspólny. Wiersze dostają pole
+    "cluster" (deduplikacja łączy więc miejsca ze wszystkich klastrów),
+    a namespacy wracają jako "kontekst:ns" – tak kluczują je manifest i --diff.
+    Klaster bez listy namespaców jest pomijany; ListError, gdy żaden się nie udał.
+    """
+    def scan_one(cluster: Cluster) -> tuple[list, list]:
+        _CLUSTER.set(cluster)
+        out = ClusterSink(sink, cluster.context) if sink is not None else None
+        namespaces, rows = scan_live(args, out)
+        for r in rows:
+            r["cluster"] = cluster.context
+        if not args.skip_cluster:
+            namespaces = namespaces + ["cluster"]
+        return [cluster_ns(ns) for ns in namespaces], rows
+
+    namespaces, results = [], []
+    with ThreadPoolExecutor(max_workers=len(CLUSTERS)) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, scan_one, c) for c in CLUSTERS]
+        # Wyniki w kolejności kontekstów – raport nie zależy od tego, kto skończył pierwszy
+        for cluster, fut in zip(CLUSTERS, futures):
+            try:
+                cluster_namespaces, rows = fut.result()
+            except ListError:
+                print(f"{YELLOW}[{cluster.context}] nie można pobrać listy namespaców – "
+                      f"klaster pominięty.{NC}", file=sys.stderr)
+                continue
+            namespaces += cluster_namespaces
+            results += rows
+    if not namespaces:
+        raise ListError("namespaces")
+    return namespaces, results
+
+
+def scan_scope(args, namespaces: list):
+    """
+    Predykat: czy wpis manifestu/inwentarza (klucz "[kontekst:]ns/...") należy
+    do zakresu tego przebiegu. Zakres wyznaczają filtry --namespace,
+    --skip-system, --skip-cluster (także dla CLUSTER_LEVEL_SOURCES spoza
+    ns "cluster") i przeskanowane konteksty, a nie lista
+    namespaców pobrana z klastra – namespace usunięty z klastra jest w zakresie,
+    więc jego wpisy są liczone jako usunięte. Poza zakresem są za to listy,
+    których w tym przebiegu nie udało się pobrać (RBAC, timeout) – brak
+    wierszy nie znaczy wtedy, że obiekty zniknęły. Wpisy spoza zakresu
+    przechodzą do kolejnego pliku bez zmian.
+    """
+    selected = set(args.namespace or [])
+    with _failed_lists_lock:
+        failed = {(context, ns, name) for context, ns, resource in _failed_lists
+                  for name in (resource, LIST_SOURCE_KINDS.get(resource))}
+    # Najdłuższe nazwy najpierw: kontekst może zawierać ":" i "/"
+    contexts = sorted(
+        {c.context for c in CLUSTERS for ns in namespaces if ns.startswith(f"{c.context}:")},
+        key=len, reverse=True,
+    )
+
+    def in_scope(key: str) -> bool:
+        context = None
+        if CLUSTERS:
+            context = next((c for c in contexts if key.startswith(f"{c}:")), None)
+            if context is None:
+                return False
+            key = key[len(context) + 1:]
+        ns, _, rest = key.partition("/")
+        if ":" in ns:
+            # Wpis z innego kontekstu (poprzedni skan z --context)
+            return False
+        if (context, ns, rest.partition("/")[0]) in failed:
+            return False
+        if ns == "cluster" or rest.startswith(CLUSTER_LEVEL_SOURCES):
+            return not args.skip_cluster
+        if selected:
+            return ns in selected
+        return not (args.skip_system and is_system_ns(ns))
+
+    return in_scope
+
+
+def run_scan(args, sink=None) -> list:
+    """
+    Jeden pełny przebieg: skan klastra (albo eksportów z --from-dir)
+    → deduplikacja. ListError, gdy nie da się pobrać listy namespaców.
+    Z `sink` (NdjsonWriter) wiersze są strumieniowane i wynik jest pusty.
+    """
+    PARSE_CACHE.new_run()
+    with _failed_lists_lock:
+        _failed_lists.clear()
+    # Podsumowania dotyczą jednego przebiegu, także przy --serve
+    with _api_bytes_lock:
+        _api_bytes.clear()
+    for api in [LIMITER] + [c.limiter for c in CLUSTERS]:
+        api.new_run()
+
+    if args.from_dir:
+        namespaces, results = scan_offline(args, sink)
+    elif CLUSTERS:
+        namespaces, results = scan_clusters(args, sink)
+    else:
+        namespaces, results = scan_live(args, sink)
+
+    PARSE_CACHE.save()
+    if not args.from_dir:
+        # Offline nie ma API, a parsowanie liczą procesy puli
+        print(f"{CYAN}{api_bytes_summary()}{NC}")
+        for cluster in CLUSTERS:
+            print(f"{CYAN}[{cluster.context}] {cluster.limiter.summary()}{NC}")
+        if not CLUSTERS:
+            print(f"{CYAN}{LIMITER.summary()}{NC}")
+        print(f"{CYAN}{PARSE_CACHE.summary()}{NC}")
+    in_scope = scan_scope(args, namespaces)
+    if SCAN_MANIFEST is not None:
+        # save() zeruje liczniki na kolejny przebieg (--serve)
+        reused, rescanned = SCAN_MANIFEST.reused, SCAN_MANIFEST.scanned
+        deleted = SCAN_MANIFEST.save(in_scope)
+        print(f"{CYAN}Skan przyrostowy: {reused} obiektów bez zmian, "
+              f"{rescanned} przeskanowanych, {deleted} usuniętych{NC}")
+
+    if SCAN_INVENTORY is not None:
+        if sink is None:
+            SCAN_INVENTORY.add(results)
+        print_diff(SCAN_INVENTORY.diff(args.warn_days, in_scope), SCAN_INVENTORY.previous_at)
+        SCAN_INVENTORY.save(in_scope)
+
+    if CHAIN_GRAPH is not None:
+        if sink is None:
+            CHAIN_GRAPH.add(results)
+        print_chains(CHAIN_GRAPH.analyze())
+        CHAIN_GRAPH.reset()
+
+    if sink is not None:
+        print(f"{CYAN}NDJSON: {sink.records} certyfikatów, {sink.aliases} aliasów{NC}")
+        return []
+
+    # Deduplikacja po fingerprincie (trafienia z cache lądują w _also_in)
+    return deduplicate(results)
+
+
 # ─── Main ────────────────────────────────────────────────────────────────────
 
 def main():
+    global CERT_PARSER, PARSE_CACHE, SCAN_MANIFEST, SCAN_INVENTORY, CHAIN_GRAPH
+    global PAGE_SIZE, LIMITER, CLUSTERS, PARSE_POOL, PARSE_PROCS
     parser = argparse.ArgumentParser(
         description="OpenShift Certificate Scanner – skanuje Secrets, ConfigMaps, Routes (bez exec do podów)"
     )
@@ -420,6 +3141,16 @@ def main():
         "--json", action="store_true",
         help="Wyjście w formacie JSON zamiast czytelnego raportu"
     )
+    parser.add_argument(
+        "--ndjson", action="store_true",
+        help="Strumień NDJSON na stdout: rekord na certyfikat od razu po "
+             "sparsowaniu, duplikaty jako rekordy alias_of"
+    )
+    parser.add_argument(
+        "--profile", nargs="?", const="-", default=None, metavar="PLIK",
+        help="Czas, liczba wywołań i bajty per faza (oc per zasób, base64, PEM, "
+             "parsowanie, deduplikacja, raport): tabela na stderr albo JSON do PLIKU"
+    )
     parser.add_argument(
         "--namespace", "-n", default=None, nargs="+",
         help="Skanuj tylko podane namespacy (można podać kilka, domyślnie: wszystkie)"
@@ -432,54 +3163,225 @@ def main():
         "--skip-cluster", action="store_true",
         help="Pomiń zasoby cluster-scoped (APIServer, IngressController, ETCD)"
     )
+    parser.add_argument(
+        "--cluster-wide", action="store_true",
+        help="Pobierz Secrets/ConfigMaps/Routes jednym 'oc get -A' na typ "
+             "(fallback per namespace, gdy RBAC nie pozwala)"
+    )
+    parser.add_argument(
+        "--lean-secrets", action="store_true",
+        help="Nie pobieraj Secretów typów bez certyfikatów (Helm, pull-secrety, "
+             "basic/ssh-auth) – filtr --field-selector po stronie API"
+    )
+    parser.add_argument(
+        "--page-size", type=int, default=0, metavar="N",
+        help="Listuj stronami po N obiektów (limit/continue) i dekoduj je "
+             "strumieniowo – stała pamięć niezależnie od wielkości namespace"
+    )
+    parser.add_argument(
+        "--parser", choices=("builtin", "openssl"), default=CERT_PARSER,
+        help="Silnik parsowania certyfikatów: wbudowany parser DER "
+             "lub openssl x509 w podprocesie (default: builtin)"
+    )
+    parser.add_argument(
+        "--parse-procs", type=int, default=0, metavar="N",
+        help="Pula N procesów parsujących duże bundle równolegle z pobieraniem "
+             "z API; 0 = parsowanie w wątkach skanu (default: 0, "
+             "przy --from-dir parsują procesy --workers)"
+    )
+    parser.add_argument(
+        "--cache-dir", default=None, metavar="DIR",
+        help="Katalog trwałego cache sparsowanych certyfikatów "
+             "(parsowane są tylko nowe/zmienione PEM-y)"
+    )
+    parser.add_argument(
+        "--cache-max-entries", type=int, default=200_000, metavar="N",
+        help="Maks. liczba wpisów w cache na dysku (default: 200000)"
+    )
+    parser.add_argument(
+        "--cache-max-age", type=int, default=30, metavar="DNI",
+        help="Usuń z cache wpisy nieużywane dłużej niż N dni (default: 30)"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Skan przyrostowy (wymaga --cache-dir): obiekty z niezmienionym "
+             "resourceVersion biorą wyniki z poprzedniego skanu"
+    )
+    parser.add_argument(
+        "--diff", action="store_true",
+        help="Raport zmian względem poprzedniego przebiegu (wymaga --cache-dir): "
+             "nowe, zrotowane, usunięte i niezrotowane przed --warn-days"
+    )
+    parser.add_argument(
+        "--chains", action="store_true",
+        help="Analiza łańcuchów CA w całym inwentarzu: brakujący lub wygasły "
+             "wystawca, nieużywane certyfikaty pośrednie"
+    )
+    parser.add_argument(
+        "--context", action="append", default=[], metavar="KONTEKST",
+        help="Kontekst kubeconfig do skanowania (można powtarzać); klastry "
+             "skanowane równolegle, raport i deduplikacja wspólne"
+    )
+    parser.add_argument(
+        "--all-contexts", action="store_true",
+        help="Skanuj wszystkie konteksty z kubeconfig (oc config get-contexts)"
+    )
+    parser.add_argument(
+        "--from-dir", metavar="KATALOG",
+        help="Skan offline: eksporty JSON/YAML (oc get -o json|yaml, must-gather) "
+             "zamiast wywołań oc; pliki w puli --workers procesów"
+    )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="Tryb ciągły: lista + watch na Secrets/ConfigMaps/Routes, zdarzenie "
+             "gdy certyfikat wchodzi w okno --warn-days lub wygasa"
+    )
+    parser.add_argument(
+        "--serve", type=int, default=None, metavar="PORT",
+        help="Eksporter OpenMetrics: skan w tle, /metrics z wyników w pamięci"
+    )
+    parser.add_argument(
+        "--serve-addr", default="127.0.0.1", metavar="ADRES",
+        help="Adres nasłuchu dla --serve (default: 127.0.0.1)"
+    )
+    parser.add_argument(
+        "--refresh-interval", type=int, default=3600, metavar="SEK",
+        help="Co ile sekund odświeżać skan w trybie --serve (default: 3600)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, metavar="N",
+        help="Liczba wątków skanujących namespacy/źródła równolegle (default: 1)"
+    )
+    parser.add_argument(
+        "--max-inflight", type=int, default=None, metavar="N",
+        help="Maks. liczba wywołań oc jednocześnie w locie; przy --page-size "
+             "obejmuje też przetwarzanie czytanej strony; przy wielu "
+             "kontekstach limit per klaster (default: = --workers)"
+    )
+    parser.add_argument(
+        "--qps", type=float, default=20.0,
+        help="Maks. tempo wywołań API na sekundę; przy 429/5xx/timeoutach "
+             "limiter sam zwalnia (default: 20)"
+    )
+    parser.add_argument(
+        "--burst", type=int, default=20,
+        help="Ile wywołań może pójść naraz ponad tempo --qps (default: 20)"
+    )
     args = parser.parse_args()
+    if args.from_dir and (args.watch or args.incremental):
+        parser.error("--from-dir nie działa z --watch ani --incremental")
+    if (args.context or args.all_contexts) and (args.watch or args.from_dir):
+        parser.error("--context/--all-contexts nie działa z --watch ani --from-dir")
+    CERT_PARSER = args.parser
+    PROFILE.enabled = args.profile is not None
+    PAGE_SIZE = max(0, args.page_size)
+    PARSE_CACHE = ParseCache(args.cache_dir, args.cache_max_entries, args.cache_max_age)
+    if args.parse_procs > 0 and not args.from_dir:
+        PARSE_PROCS = args.parse_procs
+        PARSE_POOL = start_parse_pool(PARSE_PROCS)
+    if args.incremental:
+        if not args.cache_dir:
+            parser.error("--incremental wymaga --cache-dir")
+        SCAN_MANIFEST = ScanManifest(args.cache_dir)
+    if args.diff:
+        if not args.cache_dir:
+            parser.error("--diff wymaga --cache-dir")
+        SCAN_INVENTORY = ScanInventory(args.cache_dir)
+    if args.chains:
+        CHAIN_GRAPH = ChainGraph()
+        # Wystawcy z systemowego bundla CA (publiczne CA) nie są "brakujący"
+        cafile = ssl.get_default_verify_paths().cafile
+        if cafile and os.path.exists(cafile):
+            with open(cafile, encoding="utf-8", errors="ignore") as f:
+                CHAIN_GRAPH.add_trusted(extract_pems(f.read()))
+    set_max_inflight(args.max_inflight or args.workers)
+    LIMITER = RateLimiter(args.qps, args.burst)
+    contexts = args.context
+    if args.all_contexts:
+        contexts = run_oc_raw("config", "get-contexts", "-o", "name").split()
+        if not contexts:
+            parser.error("brak kontekstów w kubeconfig")
+    # Osobny limiter i --max-inflight per klaster: throttling jednego API
+    # nie spowalnia reszty, a klastry faktycznie skanujemy równolegle
+    CLUSTERS = [Cluster(c, RateLimiter(args.qps, args.burst), args.max_inflight or args.workers)
+                for c in dict.fromkeys(contexts)]
+    if args.lean_secrets:
+        FIELD_SELECTORS["secrets"] = ",".join(
+            f"type!={t}" for t in SECRET_TYPES_WITHOUT_CERTS
+        )
     warn_days = args.warn_days
 
-    # Sprawdź czy oc jest zalogowany
-    whoami = run_oc_raw("whoami")
-    if not whoami:
-        print(f"{RED}Błąd: brak aktywnej sesji oc. Zaloguj się najpierw.{NC}", file=sys.stderr)
-        sys.exit(1)
-    print(f"{CYAN}Zalogowany jako: {whoami}{NC}")
-
-    # Pobierz listę namespaców
-    if args.namespace:
-        namespaces = args.namespace
-    else:
-        ns_data = run_oc("get", "namespaces")
-        if not ns_data:
-            print(f"{RED}Błąd: nie można pobrać listy namespaców.{NC}", file=sys.stderr)
+    sink = None
+    if args.ndjson:
+        # stdout należy do rekordów NDJSON – komunikaty postępu idą na stderr
+        sink = NdjsonWriter(sys.stdout)
+        sys.stdout = sys.stderr
+
+    # Sprawdź czy oc jest zalogowany (offline oc nie jest potrzebny)
+    if CLUSTERS:
+        alive = []
+        for cluster in CLUSTERS:
+            token = _CLUSTER.set(cluster)
+            whoami = run_oc_raw("whoami")
+            _CLUSTER.reset(token)
+            if whoami:
+                print(f"{CYAN}[{cluster.context}] Zalogowany jako: {whoami}{NC}")
+                alive.append(cluster)
+            else:
+                print(f"{YELLOW}[{cluster.context}] brak aktywnej sesji – pomijam.{NC}",
+                      file=sys.stderr)
+        if not alive:
+            print(f"{RED}Błąd: brak aktywnej sesji oc w żadnym kontekście.{NC}", file=sys.stderr)
             sys.exit(1)
-        namespaces = [item["metadata"]["name"] for item in ns_data.get("items", [])]
-
-    if args.skip_system:
-        namespaces = [ns for ns in namespaces if not is_system_ns(ns)]
-
-    print(f"{CYAN}Namespaców do skanowania: {len(namespaces)}{NC}\n")
+        CLUSTERS = alive
+    elif not args.from_dir:
+        whoami = run_oc_raw("whoami")
+        if not whoami:
+            print(f"{RED}Błąd: brak aktywnej sesji oc. Zaloguj się najpierw.{NC}", file=sys.stderr)
+            sys.exit(1)
+        print(f"{CYAN}Zalogowany jako: {whoami}{NC}")
 
-    results = []
+    if args.watch:
+        selected = set(args.namespace or [])
 
-    # Skanuj każdy namespace
-    for i, ns in enumerate(namespaces, 1):
-        tag = f"[SYS]" if is_system_ns(ns) else "[APP]"
-        sys.stdout.write(f"\r  Skanowanie {i}/{len(namespaces)}: {tag} {ns:<50}")
-        sys.stdout.flush()
+        def wanted(ns: str) -> bool:
+            if selected:
+                return ns in selected
+            return not (args.skip_system and is_system_ns(ns))
 
-        scan_secrets(ns, results)
-        scan_configmaps(ns, results)
-        scan_routes(ns, results)
+        watch_loop(wanted, warn_days, args.json)
+        return
 
-    print()  # newline po progress
+    if args.serve:
+        store = MetricsStore()
+        serve_metrics(store, args.serve_addr, args.serve)
+        print(f"{CYAN}Metryki: http://{args.serve_addr}:{args.serve}/metrics "
+              f"(odświeżanie co {args.refresh_interval} s){NC}")
+        while True:
+            started = time.monotonic()
+            try:
+                results = run_scan(args)
+            except ListError as e:
+                print(f"{RED}Błąd skanu: {e} – metryki z poprzedniego przebiegu.{NC}",
+                      file=sys.stderr)
+            else:
+                store.update(results, time.monotonic() - started)
+            time.sleep(args.refresh_interval)
 
-    # Zasoby cluster-level
-    if not args.skip_cluster:
-        print(f"{CYAN}Skanowanie zasobów cluster-level...{NC}")
-        scan_cluster_level(results)
+    try:
+        results = run_scan(args, sink)
+    except ListError:
+        print(f"{RED}Błąd: nie można pobrać listy namespaców.{NC}", file=sys.stderr)
+        sys.exit(1)
 
-    # Deduplikacja po fingerprincie
-    results = deduplicate(results)
+    if sink is None:
+        print_report(results, args.warn_days, args.json)
 
-    print_report(results, args.warn_days, args.json)
+    if args.profile == "-":
+        print(PROFILE.table(), file=sys.stderr)
+    elif args.profile:
+        with open(args.profile, "w", encoding="utf-8") as f:
+            json.dump(PROFILE.report(), f, indent=2, ensure_ascii=False)
 
 
 if __name__ == "__main__":
@@ -25,6 +25,7 @@ Przykłady:
     python3 ns_resource_report.py --no-top                # bez metryk real-time
     python3 ns_resource_report.py --sort mem-req          # sortuj po MEM Request
     python3 ns_resource_report.py --exclude kube-system --exclude monitoring
+    python3 ns_resource_report.py --per-namespace         # osobne oc get pods na namespace
 """
 
 import sys
@@ -183,6 +184,45 @@ def get_running_pods_resources(namespace):
             'no_req_pods': 0, 'error': 'blad parsowania JSON'
         }
 
+    return sum_pods_resources(data.get('items', []))
+
+
+def get_all_running_pods_resources(namespaces):
+    """
+    Jak get_running_pods_resources, ale dla wszystkich namespace'ów naraz:
+    jedno 'oc get pods -A' zamiast osobnego wywołania na każdy namespace,
+    pody grupowane po metadata.namespace w jednym przebiegu.
+
+    Zwraca słownik {namespace: dane} dla każdego z podanych namespace'ów
+    (bez Running podów = zera) albo None, gdy listy klastrowej nie da się
+    pobrać (np. brak uprawnień do listowania podów we wszystkich namespace'ach).
+    """
+    stdout, stderr, rc = run_oc([
+        'get', 'pods',
+        '-A',
+        '--field-selector=status.phase=Running',
+        '-o', 'json'
+    ])
+
+    if rc != 0:
+        return None
+
+    try:
+        data = json.loads(stdout)
+    except json.JSONDecodeError:
+        return None
+
+    pods_by_ns = {ns: [] for ns in namespaces}
+    for pod in data.get('items', []):
+        ns = pod.get('metadata', {}).get('namespace')
+        if ns in pods_by_ns:
+            pods_by_ns[ns].append(pod)
+
+    return {ns: sum_pods_resources(pods) for ns, pods in pods_by_ns.items()}
+
+
+def sum_pods_resources(pods):
+    """Sumuje requests/limits kontenerów podanych podów (format jak get_running_pods_resources)."""
     pods_count = 0
     no_req_pods = 0
     total_cpu_req_m = 0.0
@@ -190,7 +230,7 @@ def get_running_pods_resources(namespace):
     total_mem_req_mib = 0.0
     total_mem_lim_mib = 0.0
 
-    for pod in data.get('items', []):
+    for pod in pods:
         pods_count += 1
         pod_has_req = False
 
@@ -264,6 +304,35 @@ def get_top_pods(namespace):
     return {'cpu_m': total_cpu_m, 'mem_mib': total_mem_mib}
 
 
+def get_all_top_pods():
+    """
+    Jak get_top_pods, ale jednym 'oc adm top pods -A' dla całego klastra.
+
+    Zwraca słownik {namespace: {'cpu_m', 'mem_mib'}} (namespace'y bez metryk
+    nie występują) albo None, gdy wywołanie się nie powiodło.
+    """
+    stdout, stderr, rc = run_oc([
+        'adm', 'top', 'pods',
+        '-A',
+        '--no-headers'
+    ])
+
+    if rc != 0:
+        return None
+
+    top = {}
+    for line in stdout.strip().splitlines():
+        parts = line.split()
+        # Oczekiwany format: NAMESPACE  NAME  CPU(cores)  MEMORY(bytes)
+        if len(parts) < 4:
+            continue
+        ns_top = top.setdefault(parts[0], {'cpu_m': 0.0, 'mem_mib': 0.0})
+        ns_top['cpu_m'] += convert_cpu_to_m(parts[2])
+        ns_top['mem_mib'] += convert_memory_to_mib(parts[3])
+
+    return top
+
+
 # ---------------------------------------------------------------------------
 # Formatowanie wartości
 # ---------------------------------------------------------------------------
@@ -536,6 +605,14 @@ def main():
             'Szybsze wykonanie, nie wymaga metrics-server.'
         )
     )
+    parser.add_argument(
+        '--per-namespace',
+        action='store_true',
+        help=(
+            'Osobne wywołania oc na każdy namespace zamiast jednego '
+            '\'oc get pods -A\' (wolniejsze; przydatne przy braku uprawnień klastrowych).'
+        )
+    )
     parser.add_argument(
         '--sort',
         default='cpu-req',
@@ -575,15 +652,34 @@ def main():
         print("  (pobieranie metryk 'oc adm top' — użyj --no-top aby przyspieszyć)")
     print()
 
+    # Dla wielu namespace'ów: jedno 'oc get pods -A' (i jedno 'oc adm top pods -A')
+    # zamiast wywołań per namespace; przy błędzie wracamy do trybu per namespace
+    all_pods = None
+    all_top = None
+    if not args.namespace and not args.per_namespace:
+        print("Pobieranie Running podów z całego klastra (oc get pods -A)...")
+        all_pods = get_all_running_pods_resources(namespaces)
+        if all_pods is None:
+            print("  Nie udało się pobrać podów klastrowo — pobieram per namespace.")
+        elif not args.no_top:
+            all_top = get_all_top_pods()
+        print()
+
     # Zbieranie danych
     ns_data = {}
     for i, ns in enumerate(namespaces, 1):
         print(f"  [{i:>3}/{len(namespaces)}] {ns:<45}", end='', flush=True)
 
-        data = get_running_pods_resources(ns)
+        if all_pods is not None:
+            data = all_pods[ns]
+        else:
+            data = get_running_pods_resources(ns)
 
         if not args.no_top:
-            data['top'] = get_top_pods(ns)
+            if all_top is not None:
+                data['top'] = all_top.get(ns)
+            else:
+                data['top'] = get_top_pods(ns)
 
         ns_data[ns] = data
 